@@ -0,0 +1,92 @@
+"""
+This module learns the wait timeout of each page element from how long the
+element took to appear in previous waits, so that missing elements fail
+fast while slow but healthy pages still get enough time.
+"""
+
+import json
+import logging
+import math
+import os
+import threading
+from collections import deque
+
+PERCENTILE = 0.99
+FACTOR = 2.0
+FLOOR_SECONDS = 5.0
+WINDOW_SIZE = 200
+MIN_SAMPLES = 20
+
+
+class AdaptiveTimeouts:
+    """Per-key timeouts derived from a rolling percentile of wait durations.
+
+    Once a key has `min_samples` observations, its timeout is the
+    `percentile` of the last `window_size` durations times `factor`,
+    clamped between `floor` and the fixed timeout it replaces. The samples
+    are persisted as JSON so that later runs start with what was learned.
+    """
+
+    def __init__(
+        self,
+        path: str | None = None,
+        percentile: float = PERCENTILE,
+        factor: float = FACTOR,
+        floor: float = FLOOR_SECONDS,
+        window_size: int = WINDOW_SIZE,
+        min_samples: int = MIN_SAMPLES,
+    ) -> None:
+        self.path = path
+        self.percentile = percentile
+        self.factor = factor
+        self.floor = floor
+        self.window_size = window_size
+        self.min_samples = min_samples
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._lock = threading.Lock()
+        self._samples: dict[str, deque[float]] = {}
+        if path is not None and os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        """Load the samples saved by a previous run."""
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                saved = json.load(f)
+        except (OSError, ValueError) as err:
+            self.logger.warning("Ignoring unreadable %s: %s", self.path, err)
+            return
+        for key, samples in saved.items():
+            self._samples[key] = deque(samples, maxlen=self.window_size)
+
+    def get(self, key: str, default: float) -> float:
+        """Get the timeout of the key, never longer than the default."""
+        with self._lock:
+            samples = sorted(self._samples.get(key, ()))
+        if len(samples) < self.min_samples:
+            return default
+        index = math.ceil(self.percentile * len(samples)) - 1
+        learned = samples[index] * self.factor
+        return min(default, max(self.floor, learned))
+
+    def observe(self, key: str, seconds: float) -> None:
+        """Record how long a successful wait for the key took."""
+        with self._lock:
+            samples = self._samples.setdefault(
+                key, deque(maxlen=self.window_size)
+            )
+            samples.append(seconds)
+
+    def save(self) -> None:
+        """Save the samples for later runs."""
+        if self.path is None:
+            return
+        with self._lock:
+            saved = {
+                key: list(samples) for key, samples in self._samples.items()
+            }
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(saved, f)
+        os.replace(temp_path, self.path)
@@ -0,0 +1,101 @@
+"""
+This module keeps an index of the articles already scraped, so the URL list
+can be filtered in bulk before any browser is launched.
+"""
+
+import hashlib
+import logging
+import os
+import sqlite3
+import threading
+
+INDEX_FILENAME = "index.sqlite3"
+LOCAL_STATUSES = ["complete", "incomplete"]
+FIRESTORE_STATUS = "firestore"
+
+
+def hash_url(url: str) -> str:
+    """Hash the URL the same way article files are named."""
+    return hashlib.sha256(url.encode()).hexdigest()
+
+
+class ArticleIndex:
+    """SQLite index of scraped article URL hashes and their status."""
+
+    def __init__(self, output_dir: str) -> None:
+        self.output_dir = output_dir
+        self.logger = logging.getLogger(self.__class__.__name__)
+        os.makedirs(output_dir, exist_ok=True)
+        path = os.path.join(output_dir, INDEX_FILENAME)
+        is_new = not os.path.exists(path)
+
+        # Shared by the scraping threads, which take turns through the lock.
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            path, timeout=30, check_same_thread=False
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS articles "
+            "(url_hash TEXT PRIMARY KEY, status TEXT NOT NULL)"
+        )
+        if is_new:
+            self.rebuild()
+
+    def rebuild(self) -> None:
+        """Rebuild the index from the article files in the output folder."""
+        self.logger.info("Indexing articles in %s...", self.output_dir)
+        rows = []
+        for status in LOCAL_STATUSES:
+            directory = os.path.join(self.output_dir, status)
+            if not os.path.isdir(directory):
+                continue
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    url_hash, ext = os.path.splitext(entry.name)
+                    if ext == ".json":
+                        rows.append((url_hash, status))
+        self.record_many(rows)
+        self.logger.info("Indexed %s articles.", len(rows))
+
+    def record(self, url_hash: str, status: str) -> None:
+        """Record the status of a scraped article."""
+        self.record_many([(url_hash, status)])
+
+    def record_many(self, rows: list[tuple[str, str]]) -> None:
+        """Record the status of several scraped articles at once."""
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO articles (url_hash, status) "
+                "VALUES (?, ?)",
+                rows,
+            )
+
+    def get_hashes(self, statuses: list[str] | None = None) -> set[str]:
+        """Load the hashes of the indexed articles with the given statuses."""
+        query = "SELECT url_hash FROM articles"
+        params = []
+        if statuses is not None:
+            placeholders = ", ".join("?" for _ in statuses)
+            query += f" WHERE status IN ({placeholders})"
+            params = statuses
+        with self._lock:
+            rows = self.connection.execute(query, params).fetchall()
+        return {url_hash for (url_hash,) in rows}
+
+    def filter_unscraped(
+        self,
+        urls: list[str],
+        statuses: list[str] | None = None,
+    ) -> list[str]:
+        """Drop the URLs of articles indexed with the given statuses."""
+        scraped = self.get_hashes(statuses)
+        unscraped = [url for url in urls if hash_url(url) not in scraped]
+        self.logger.info(
+            "Skipping %s articles already scraped.",
+            len(urls) - len(unscraped),
+        )
+        return unscraped
+
+    def close(self) -> None:
+        """Close the index."""
+        self.connection.close()
@@ -3,104 +3,640 @@ This module scrapes the article URLs from the sitemap of Rappler's website.
 """
 
 import hashlib
+import json
 import logging
 import os
+import sqlite3
+import threading
+import time
 import asyncio
-from aiohttp import ClientSession
+from collections.abc import AsyncIterator
+from contextlib import aclosing, asynccontextmanager, nullcontext
+from aiohttp import (
+    ClientConnectionError,
+    ClientPayloadError,
+    ClientResponse,
+    ClientResponseError,
+    ClientSession,
+    ClientTimeout,
+    TCPConnector,
+)
+from yarl import URL
 
-from bs4 import BeautifulSoup
+from lxml import etree
 
+from retry import TRANSIENT_STATUS_CODES, RetryPolicy, parse_retry_after
 
 OUTPUT_PATH = "article_urls"
-MAIN_SITEMAP = "https://www.rappler.com/sitemap_index.xml"
+BASE_URL = "https://www.rappler.com"
+MAIN_SITEMAP = f"{BASE_URL}/sitemap_index.xml"
+CHUNK_SIZE = 64 * 1024
+MAX_CONCURRENCY = 8
+REQUESTS_PER_SECOND = 5.0
+REQUEST_BURST = 10
+CONNECTION_LIMIT = 32
+CONNECTION_LIMIT_PER_HOST = 8
+DNS_CACHE_SECONDS = 300
+KEEPALIVE_SECONDS = 30
+CONNECT_TIMEOUT_SECONDS = 10
+READ_TIMEOUT_SECONDS = 60
+MAX_ATTEMPTS = 4
+CACHE_FILENAME = ".http_cache.json"
+LASTMOD_PATH = "sitemap_lastmod.sqlite3"
+SQLITE_BATCH_SIZE = 500
 
-logging.basicConfig(
-    level=logging.INFO,
-    format="%(asctime)s:%(levelname)s:%(message)s",
-)
+logger = logging.getLogger(__name__)
+
+
+def is_transient_error(err: Exception) -> bool:
+    """Check if the request failed for a reason worth retrying."""
+    if isinstance(err, ClientResponseError):
+        return err.status in TRANSIENT_STATUS_CODES
+    return isinstance(
+        err,
+        (asyncio.TimeoutError, ClientConnectionError, ClientPayloadError),
+    )
+
+
+def get_retry_after(err: Exception) -> float | None:
+    """Get the delay requested by the server through `Retry-After`."""
+    if isinstance(err, ClientResponseError) and err.headers:
+        return parse_retry_after(err.headers.get("Retry-After"))
+    return None
+
+
+RETRY_POLICY = RetryPolicy(is_transient_error, max_attempts=MAX_ATTEMPTS)
+
+
+class NotModifiedError(Exception):
+    """Raised when a conditional request finds the resource unchanged."""
+
+
+class LastmodStore:
+    """SQLite store of the last seen modification time of each URL.
+
+    Article URLs found new or modified stay pending until they are marked
+    as scraped, so that an article failing in one run is found again by
+    the next ones even if its sitemap is unchanged.
+    """
+
+    def __init__(self, path: str) -> None:
+        # Articles are marked as scraped from the scraping threads too.
+        self._lock = threading.Lock()
+        self.opened_at = time.time()
+        self.connection = sqlite3.connect(path, check_same_thread=False)
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS lastmod "
+            "(url TEXT PRIMARY KEY, lastmod TEXT)"
+        )
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS pending "
+            "(url TEXT PRIMARY KEY, lastmod TEXT, found_at REAL NOT NULL)"
+        )
+
+    def is_modified(self, url: str, lastmod: str | None) -> bool:
+        """Check if the URL is new or modified since it was last seen."""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT lastmod FROM lastmod WHERE url = ?",
+                (url,),
+            ).fetchone()
+        return row is None or (lastmod is not None and row[0] != lastmod)
+
+    def update(self, url: str, lastmod: str | None) -> None:
+        """Remember the modification time of the URL."""
+        with self._lock:
+            self.connection.execute(
+                "INSERT OR REPLACE INTO lastmod (url, lastmod) VALUES (?, ?)",
+                (url, lastmod),
+            )
+
+    def add_pending(self, url: str, lastmod: str | None) -> None:
+        """Remember an article URL to scrape with its modification time."""
+        with self._lock:
+            self.connection.execute(
+                "INSERT INTO pending (url, lastmod, found_at) "
+                "VALUES (?, ?, ?) "
+                "ON CONFLICT (url) DO UPDATE SET lastmod = excluded.lastmod",
+                (url, lastmod, time.time()),
+            )
+
+    def get_pending(self) -> list[str]:
+        """Get the article URLs not scraped yet, oldest first."""
+        with self._lock:
+            rows = self.connection.execute(
+                "SELECT url FROM pending ORDER BY found_at"
+            ).fetchall()
+        return [url for (url,) in rows]
+
+    def mark_scraped(self, urls: list[str]) -> None:
+        """Remember the modification time of the pending URLs scraped."""
+        params = [(url,) for url in urls]
+        with self._lock, self.connection:
+            self.connection.executemany(
+                "INSERT OR REPLACE INTO lastmod (url, lastmod) "
+                "SELECT url, lastmod FROM pending WHERE url = ?",
+                params,
+            )
+            self.connection.executemany(
+                "DELETE FROM pending WHERE url = ?", params
+            )
+
+    def find_rescrapes(self, urls: list[str]) -> set[str]:
+        """Find the URLs scraped before or left pending by previous runs.
+
+        Unlike the URLs seen for the first time, these must be scraped
+        whether or not their article was already saved.
+        """
+        found = set()
+        for start in range(0, len(urls), SQLITE_BATCH_SIZE):
+            chunk = urls[start : start + SQLITE_BATCH_SIZE]
+            placeholders = ", ".join("?" for _ in chunk)
+            with self._lock:
+                rows = self.connection.execute(
+                    f"SELECT url FROM lastmod WHERE url IN ({placeholders}) "
+                    f"UNION SELECT url FROM pending "
+                    f"WHERE url IN ({placeholders}) AND found_at < ?",
+                    [*chunk, *chunk, self.opened_at],
+                ).fetchall()
+            found.update(url for (url,) in rows)
+        return found
+
+    def commit(self) -> None:
+        """Persist the updates made so far."""
+        with self._lock:
+            self.connection.commit()
+
+    def close(self) -> None:
+        """Persist the updates and close the store."""
+        self.commit()
+        self.connection.close()
+
+
+class SitemapFetchError(Exception):
+    """Raised when a sitemap cannot be fetched even after retrying."""
+
+
+class HttpCache:
+    """On-disk store of the ETag and Last-Modified validators of URLs."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self._entries: dict[str, dict[str, str]] = {}
+        if os.path.exists(path):
+            with open(path, "r", encoding="utf-8") as f:
+                self._entries = json.load(f)
+
+    def get_headers(self, url: str) -> dict[str, str]:
+        """Get the headers making a request for the URL conditional."""
+        entry = self._entries.get(url, {})
+        headers = {}
+        if "etag" in entry:
+            headers["If-None-Match"] = entry["etag"]
+        if "last_modified" in entry:
+            headers["If-Modified-Since"] = entry["last_modified"]
+        return headers
+
+    def update(self, url: str, response: ClientResponse) -> None:
+        """Remember the validators sent with the response for the URL."""
+        entry = {}
+        if "ETag" in response.headers:
+            entry["etag"] = response.headers["ETag"]
+        if "Last-Modified" in response.headers:
+            entry["last_modified"] = response.headers["Last-Modified"]
+        if entry:
+            self._entries[url] = entry
+        else:
+            self._entries.pop(url, None)
+
+    def save(self) -> None:
+        """Write the validators to disk."""
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            json.dump(self._entries, f)
+        os.replace(temp_path, self.path)
+
+
+class TokenBucket:
+    """Token bucket limiting the rate of requests to a single host."""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._updated_at: float | None = None
+        self._lock = asyncio.Lock()
+
+    async def acquire(self) -> None:
+        """Wait until a token is available and consume it."""
+        async with self._lock:
+            loop = asyncio.get_running_loop()
+            while True:
+                now = loop.time()
+                if self._updated_at is not None:
+                    elapsed = now - self._updated_at
+                    self._tokens = min(
+                        self.capacity,
+                        self._tokens + elapsed * self.rate,
+                    )
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                await asyncio.sleep((1 - self._tokens) / self.rate)
+
+
+class RequestLimiter:
+    """Cap concurrent requests and rate-limit them per host."""
+
+    def __init__(
+        self,
+        max_concurrency: int = MAX_CONCURRENCY,
+        requests_per_second: float = REQUESTS_PER_SECOND,
+        burst: int = REQUEST_BURST,
+    ) -> None:
+        self.requests_per_second = requests_per_second
+        self.burst = burst
+        self._semaphore = asyncio.Semaphore(max_concurrency)
+        self._buckets: dict[str, TokenBucket] = {}
+
+    @asynccontextmanager
+    async def limit(self, url: str) -> AsyncIterator[None]:
+        """Hold a concurrency slot and a host token while requesting."""
+        host = URL(url).host or ""
+        if host not in self._buckets:
+            self._buckets[host] = TokenBucket(
+                self.requests_per_second,
+                self.burst,
+            )
+        async with self._semaphore:
+            await self._buckets[host].acquire()
+            yield
+
+
+def create_session() -> ClientSession:
+    """Create a session with connection pooling tuned for sitemaps."""
+    connector = TCPConnector(
+        limit=CONNECTION_LIMIT,
+        limit_per_host=CONNECTION_LIMIT_PER_HOST,
+        ttl_dns_cache=DNS_CACHE_SECONDS,
+        keepalive_timeout=KEEPALIVE_SECONDS,
+    )
+    timeout = ClientTimeout(
+        total=None,
+        sock_connect=CONNECT_TIMEOUT_SECONDS,
+        sock_read=READ_TIMEOUT_SECONDS,
+    )
+    return ClientSession(connector=connector, timeout=timeout)
 
 
 async def get_response(
     url: str,
     session: ClientSession,
+    limiter: RequestLimiter | None = None,
 ) -> str | None:
     """Get the response from the given URL."""
-    try:
-        async with session.get(url) as response:
-            response.raise_for_status()
-            return await response.text()
-    except Exception as err:
-        logging.error("Failed to get response from %s: %s", url, err)
-        return None
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            async with (
+                limiter.limit(url) if limiter else nullcontext(),
+                session.get(url) as response,
+            ):
+                response.raise_for_status()
+                return await response.text()
+        except Exception as err:
+            if not RETRY_POLICY.should_retry(attempt, err):
+                logger.error("Failed to get response from %s: %s", url, err)
+                return None
+            delay = RETRY_POLICY.get_delay(attempt, get_retry_after(err))
+            logger.warning(
+                "Retrying %s in %.1fs after error: %s", url, delay, err
+            )
+            await asyncio.sleep(delay)
+
+
+def read_entries(
+    parser: etree.XMLPullParser,
+    identifier: str,
+) -> list[tuple[str, str | None]]:
+    """Read the location and last modification of the completed tags."""
+    entries = []
+    for _, element in parser.read_events():
+        if etree.QName(element).localname != identifier:
+            continue
+        loc = element.findtext("{*}loc")
+        lastmod = element.findtext("{*}lastmod")
+        if loc:
+            entries.append((loc.strip(), lastmod and lastmod.strip()))
+        # Drop parsed tags so memory stays flat regardless of sitemap size.
+        element.clear()
+        while element.getprevious() is not None:
+            del element.getparent()[0]
+    return entries
+
+
+async def stream_entries(
+    response: ClientResponse,
+    identifier: str,
+) -> AsyncIterator[tuple[str, str | None]]:
+    """Parse the response incrementally and yield the tag entries."""
+    parser = etree.XMLPullParser(events=("end",))
+    async for chunk in response.content.iter_chunked(CHUNK_SIZE):
+        parser.feed(chunk)
+        for entry in read_entries(parser, identifier):
+            yield entry
+    parser.close()
+    for entry in read_entries(parser, identifier):
+        yield entry
+
+
+async def parse_sitemap_entries(
+    url: str,
+    identifier: str,
+    session: ClientSession,
+    limiter: RequestLimiter | None = None,
+    cache: HttpCache | None = None,
+) -> AsyncIterator[tuple[str, str | None]]:
+    """Stream the location and last modification of the tags.
+
+    A transient failure restarts the download, skipping the entries that
+    were already yielded before the failure. With a cache, the request is
+    conditional and `NotModifiedError` is raised if the sitemap is unchanged.
+    `SitemapFetchError` is raised once the retries are exhausted.
+    """
+    headers = cache.get_headers(url) if cache else {}
+    yielded = 0
+    attempt = 0
+    while True:
+        attempt += 1
+        try:
+            async with (
+                limiter.limit(url) if limiter else nullcontext(),
+                session.get(url, headers=headers) as response,
+            ):
+                if response.status == 304:
+                    raise NotModifiedError(url)
+                response.raise_for_status()
+                seen = 0
+                async for entry in stream_entries(response, identifier):
+                    seen += 1
+                    if seen > yielded:
+                        yielded += 1
+                        yield entry
+            # Only reached once the consumer has handled every entry.
+            if cache:
+                cache.update(url, response)
+            return
+        except NotModifiedError:
+            raise
+        except Exception as err:
+            if not RETRY_POLICY.should_retry(attempt, err):
+                raise SitemapFetchError(url) from err
+            delay = RETRY_POLICY.get_delay(attempt, get_retry_after(err))
+            logger.warning(
+                "Retrying %s in %.1fs after error: %s", url, delay, err
+            )
+            await asyncio.sleep(delay)
 
 
 async def parse_sitemap(
     url: str,
     identifier: str,
     session: ClientSession,
-) -> list[str]:
-    """Parse the sitemap and return the tags with the given identifier."""
-    response = await get_response(url, session)
-    if response is not None:
-        soup = BeautifulSoup(response, features="xml")
-        return soup.find_all(identifier)
-    else:
-        return []
+    limiter: RequestLimiter | None = None,
+    cache: HttpCache | None = None,
+) -> AsyncIterator[str]:
+    """Stream the locations of the tags with the given identifier."""
+    try:
+        async for loc, _ in parse_sitemap_entries(
+            url, identifier, session, limiter, cache
+        ):
+            yield loc
+    except SitemapFetchError as err:
+        logger.error("Failed to parse sitemap %s: %s", url, err.__cause__)
 
 
 async def get_sitemaps(
     main_sitemap: str,
     session: ClientSession,
+    limiter: RequestLimiter | None = None,
 ) -> list[str]:
     """Get the post sitemaps from the main sitemap."""
-    logging.info("Fetching post sitemaps from %s...", main_sitemap)
-    sitemap_tags = await parse_sitemap(main_sitemap, "sitemap", session)
+    logger.info("Fetching post sitemaps from %s...", main_sitemap)
+    sitemap_locs = parse_sitemap(main_sitemap, "sitemap", session, limiter)
     post_sitemaps = [
-        tag.find("loc").text
-        for tag in sitemap_tags
-        if "post-sitemap" in tag.find("loc").text
+        loc async for loc in sitemap_locs if "post-sitemap" in loc
     ]
     return post_sitemaps
 
 
+async def iter_article_urls(
+    main_sitemap: str,
+    session: ClientSession,
+    limiter: RequestLimiter | None = None,
+) -> AsyncIterator[str]:
+    """Stream the article URLs of every post sitemap, one sitemap at a time.
+
+    Post sitemaps are only downloaded as the URLs are consumed, so a consumer
+    stopping early does not fetch the remaining sitemaps.
+    """
+    for sitemap in await get_sitemaps(main_sitemap, session, limiter):
+        logger.info("Fetching article URLs from %s...", sitemap)
+        async for url in parse_sitemap(sitemap, "url", session, limiter):
+            if url.startswith(BASE_URL):
+                yield url
+
+
+async def stream_article_urls(
+    main_sitemap: str = MAIN_SITEMAP,
+    max_url: int | None = None,
+) -> AsyncIterator[str]:
+    """Stream up to `max_url` article URLs from the sitemaps."""
+    if max_url is not None and max_url <= 0:
+        return
+    count = 0
+    async with (
+        create_session() as session,
+        aclosing(
+            iter_article_urls(main_sitemap, session, RequestLimiter())
+        ) as urls,
+    ):
+        async for url in urls:
+            yield url
+            count += 1
+            if max_url is not None and count >= max_url:
+                break
+
+
+async def collect_article_urls(
+    main_sitemap: str = MAIN_SITEMAP,
+    max_url: int | None = None,
+) -> list[str]:
+    """Collect up to `max_url` article URLs from the sitemaps."""
+    logger.info("Scraping article URLs from sitemaps...")
+    async with aclosing(stream_article_urls(main_sitemap, max_url)) as urls:
+        article_urls = [url async for url in urls]
+    logger.info("Scraped %s article URLs.", len(article_urls))
+    return article_urls
+
+
+async def iter_modified_article_urls(
+    main_sitemap: str,
+    session: ClientSession,
+    store: LastmodStore,
+    limiter: RequestLimiter | None = None,
+) -> AsyncIterator[str]:
+    """Stream the article URLs that are new or modified since the last run.
+
+    The URLs left pending by previous runs come first. Post sitemaps whose
+    `<lastmod>` is unchanged are not downloaded at all, and a post sitemap
+    is only marked as seen once all its URLs were consumed. The URLs found
+    are pending until the caller marks them as scraped.
+    """
+    yielded = set()
+    for url in store.get_pending():
+        yielded.add(url)
+        yield url
+
+    logger.info("Fetching modified post sitemaps from %s...", main_sitemap)
+    try:
+        sitemap_entries = [
+            entry
+            async for entry in parse_sitemap_entries(
+                main_sitemap, "sitemap", session, limiter
+            )
+        ]
+    except SitemapFetchError as err:
+        logger.error(
+            "Failed to parse sitemap %s: %s", main_sitemap, err.__cause__
+        )
+        return
+
+    for sitemap, sitemap_lastmod in sitemap_entries:
+        if "post-sitemap" not in sitemap:
+            continue
+        # Sitemaps without a lastmod cannot be known unchanged.
+        if sitemap_lastmod is not None and not store.is_modified(
+            sitemap, sitemap_lastmod
+        ):
+            logger.info("Sitemap %s not modified. Skipping...", sitemap)
+            continue
+
+        logger.info("Fetching modified article URLs from %s...", sitemap)
+        try:
+            async for url, lastmod in parse_sitemap_entries(
+                sitemap, "url", session, limiter
+            ):
+                if store.is_modified(url, lastmod):
+                    store.add_pending(url, lastmod)
+                    if url not in yielded:
+                        yielded.add(url)
+                        yield url
+        except SitemapFetchError as err:
+            logger.error(
+                "Failed to parse sitemap %s: %s", sitemap, err.__cause__
+            )
+            continue
+        store.update(sitemap, sitemap_lastmod)
+        store.commit()
+
+
+async def collect_modified_article_urls(
+    store: LastmodStore,
+    main_sitemap: str = MAIN_SITEMAP,
+    max_url: int | None = None,
+) -> list[str]:
+    """Collect the article URLs that are new or modified since the last run.
+
+    The caller marks them in the store once they are scraped.
+    """
+    article_urls = []
+    try:
+        async with (
+            create_session() as session,
+            aclosing(
+                iter_modified_article_urls(
+                    main_sitemap, session, store, RequestLimiter()
+                )
+            ) as urls,
+        ):
+            async for url in urls:
+                article_urls.append(url)
+                if max_url is not None and len(article_urls) >= max_url:
+                    break
+    finally:
+        store.commit()
+    logger.info("Found %s new or modified article URLs.", len(article_urls))
+    return article_urls
+
+
 async def scrape_article_urls(
     url: str,
     output_dir: str,
     session: ClientSession,
+    limiter: RequestLimiter | None = None,
+    cache: HttpCache | None = None,
 ) -> None:
     """Scrape the article URLs from the given sitemap URL."""
-    logging.info("Fetching article URLs from %s...", url)
-    url_tags = await parse_sitemap(url, "url", session)
-    article_urls = [tag.find("loc").text for tag in url_tags]
-    if not article_urls:
-        logging.warning("No article URLs found in %s", url)
-    else:
-        write_to_file(article_urls, output_dir)
+    logger.info("Fetching article URLs from %s...", url)
+    article_urls = parse_sitemap(url, "url", session, limiter, cache)
+    try:
+        if not await write_to_file(article_urls, output_dir):
+            logger.warning("No article URLs found in %s", url)
+    except NotModifiedError:
+        logger.info("Sitemap %s not modified. Skipping...", url)
 
 
-def write_to_file(
-    urls: list[str],
+async def write_to_file(
+    urls: AsyncIterator[str],
     output_dir: str,
+) -> int:
+    """Stream the article URLs to a file named after the first URL."""
+    count = 0
+    f = None
+    try:
+        async for url in urls:
+            if f is None:
+                os.makedirs(output_dir, exist_ok=True)
+                url_hash = hashlib.md5(url.encode()).hexdigest()
+                filename = f"{url_hash}.txt"
+                logger.info("Writing article URLs to %s...", filename)
+                filepath = os.path.join(output_dir, filename)
+                f = open(filepath, "w")
+            else:
+                f.write("\n")
+            f.write(url)
+            count += 1
+    finally:
+        if f is not None:
+            f.close()
+    return count
+
+
+async def main(
+    max_concurrency: int = MAX_CONCURRENCY,
+    requests_per_second: float = REQUESTS_PER_SECOND,
 ) -> None:
-    """Write the article URLs to a file."""
-    os.makedirs(output_dir, exist_ok=True)
-    url_hash = hashlib.md5(urls[0].encode()).hexdigest()
-    filename = f"{url_hash}.txt"
-    logging.info("Writing article URLs to %s...", filename)
-    filepath = os.path.join(output_dir, filename)
-    with open(filepath, "w") as f:
-        f.write("\n".join(urls))
-
-
-async def main() -> None:
-    async with ClientSession() as session:
-        post_sitemaps = await get_sitemaps(MAIN_SITEMAP, session)
+    limiter = RequestLimiter(max_concurrency, requests_per_second)
+    # Kept with the output so that deleting the output also resets the cache.
+    cache = HttpCache(os.path.join(OUTPUT_PATH, CACHE_FILENAME))
+    async with create_session() as session:
+        post_sitemaps = await get_sitemaps(MAIN_SITEMAP, session, limiter)
         tasks = [
-            scrape_article_urls(url, OUTPUT_PATH, session)
+            scrape_article_urls(url, OUTPUT_PATH, session, limiter, cache)
             for url in post_sitemaps
         ]
         await asyncio.gather(*tasks)
+    cache.save()
+    logger.info("Retry stats: %s", dict(RETRY_POLICY.stats))
 
 
 if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s:%(levelname)s:%(message)s",
+    )
     asyncio.run(main())
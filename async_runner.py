@@ -0,0 +1,42 @@
+"""
+This module runs an asyncio event loop in a background thread, so that the
+scraper threads share one HTTP session, with its connection pool and rate
+limiter, instead of starting a loop and a session for every article.
+"""
+
+import asyncio
+import threading
+from collections.abc import Coroutine
+from typing import Any
+
+from article_url_scraper import RequestLimiter, create_session
+
+
+class AsyncRunner:
+    """Event loop thread owning the HTTP session shared by the scrapers."""
+
+    def __init__(self) -> None:
+        self.loop = asyncio.new_event_loop()
+        self._thread = threading.Thread(
+            target=self.loop.run_forever, name="event-loop", daemon=True
+        )
+        self._thread.start()
+        self.session = None
+        self.limiter = None
+        self.run(self._open())
+
+    async def _open(self) -> None:
+        """Create the session and limiter inside the loop."""
+        self.session = create_session()
+        self.limiter = RequestLimiter()
+
+    def run(self, coroutine: Coroutine) -> Any:
+        """Run the coroutine in the loop and wait for its result."""
+        return asyncio.run_coroutine_threadsafe(coroutine, self.loop).result()
+
+    def close(self) -> None:
+        """Close the session and stop the loop."""
+        self.run(self.session.close())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self._thread.join()
+        self.loop.close()
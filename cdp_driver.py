@@ -0,0 +1,220 @@
+"""
+This module contains a Chrome WebDriver capturing network requests through
+the Chrome DevTools Protocol instead of seleniumwire's man-in-the-middle
+proxy, so that page traffic is not decrypted and re-encrypted in Python.
+
+It exposes the subset of the seleniumwire API used by the scrapers:
+`requests`, `scope` and `wait_for_request`. Requests are captured from
+every tab of the browser.
+"""
+
+import base64
+import json
+import re
+import time
+from collections import OrderedDict
+
+from selenium import webdriver
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.remote.webdriver import WebDriver
+
+REQUEST_STORAGE_MAX_SIZE = 100
+POLL_INTERVAL_SECONDS = 0.2
+
+
+def block_urls(driver: WebDriver, patterns: list[str]) -> None:
+    """Make Chrome block the URLs matching the patterns in the current tab.
+
+    Blocked requests fail inside the browser, so they never reach a proxy.
+    """
+    driver.execute_cdp_cmd("Network.enable", {})
+    driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": patterns})
+
+
+def strip_pseudo_headers(headers: dict[str, str]) -> dict[str, str]:
+    """Drop the HTTP/2 pseudo-headers, such as `:path`, from the headers."""
+    return {
+        name: value
+        for name, value in headers.items()
+        if not name.startswith(":")
+    }
+
+
+class CapturedResponse:
+    """Response of a captured request."""
+
+    def __init__(
+        self,
+        status_code: int,
+        headers: dict[str, str],
+        body: bytes = b"",
+    ) -> None:
+        self.status_code = status_code
+        self.headers = headers
+        self.body = body
+
+
+class CapturedRequest:
+    """Request captured from the DevTools network events."""
+
+    def __init__(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str],
+        document_url: str | None = None,
+        target: str | None = None,
+    ) -> None:
+        self.method = method
+        self.url = url
+        self.headers = headers
+        self.document_url = document_url
+        self.target = target
+        self.response: CapturedResponse | None = None
+
+
+class CdpChrome(webdriver.Chrome):
+    """Chrome WebDriver capturing requests from its performance log.
+
+    Only requests matching `scope` are kept, up to `max_requests`, and their
+    response body is fetched with `Network.getResponseBody` once loaded.
+    URLs matching the wildcard patterns of `blocked_urls` are blocked by
+    Chrome itself.
+    """
+
+    def __init__(
+        self,
+        options: webdriver.ChromeOptions,
+        scope: list[str] | None = None,
+        blocked_urls: list[str] | None = None,
+        max_requests: int = REQUEST_STORAGE_MAX_SIZE,
+    ) -> None:
+        options.set_capability("goog:loggingPrefs", {"performance": "ALL"})
+        options.add_experimental_option(
+            "perfLoggingPrefs", {"enableNetwork": True, "enablePage": False}
+        )
+        super().__init__(options=options)
+        self.scope = scope or []
+        self.max_requests = max_requests
+        self._requests: OrderedDict[str, CapturedRequest] = OrderedDict()
+        self._responses: dict[str, CapturedResponse] = {}
+        self._extra_headers: dict[str, dict[str, str]] = {}
+        self.blocked_urls = blocked_urls or []
+        self.setup_current_tab()
+
+    def setup_current_tab(self) -> None:
+        """Enable the network domain and URL blocking in the current tab."""
+        block_urls(self, self.blocked_urls)
+
+    def _in_scope(self, url: str) -> bool:
+        """Check if the requests to the URL should be captured."""
+        return not self.scope or any(
+            re.search(pattern, url) for pattern in self.scope
+        )
+
+    def _drain_log(self) -> None:
+        """Process the network events logged since the last call."""
+        for entry in self.get_log("performance"):
+            logged = json.loads(entry["message"])
+            message = logged["message"]
+            method = message["method"]
+            params = message.get("params", {})
+            request_id = params.get("requestId")
+
+            if method == "Network.requestWillBeSent":
+                request = params["request"]
+                if not self._in_scope(request["url"]):
+                    continue
+                headers = strip_pseudo_headers(request["headers"])
+                headers.update(self._extra_headers.pop(request_id, {}))
+                self._requests[request_id] = CapturedRequest(
+                    request["method"],
+                    request["url"],
+                    headers,
+                    document_url=params.get("documentURL"),
+                    target=logged.get("webview"),
+                )
+                self._requests.move_to_end(request_id)
+                while len(self._requests) > self.max_requests:
+                    self._requests.popitem(last=False)
+            elif method == "Network.requestWillBeSentExtraInfo":
+                # Carries the headers added by the network stack, cookies
+                # included, and may arrive before the request itself. Over
+                # HTTP/2 they include pseudo-headers, which cannot be
+                # replayed as header lines.
+                headers = strip_pseudo_headers(params["headers"])
+                if request_id in self._requests:
+                    self._requests[request_id].headers.update(headers)
+                else:
+                    self._extra_headers[request_id] = headers
+            elif method == "Network.responseReceived":
+                if request_id in self._requests:
+                    response = params["response"]
+                    self._responses[request_id] = CapturedResponse(
+                        response["status"], response["headers"]
+                    )
+            elif method == "Network.loadingFinished":
+                response = self._responses.pop(request_id, None)
+                if response is not None and request_id in self._requests:
+                    request = self._requests[request_id]
+                    response.body = self._get_response_body(
+                        request_id, request.target
+                    )
+                    request.response = response
+
+        # Extra headers of requests out of scope are never claimed.
+        self._extra_headers.clear()
+
+    def _get_response_body(
+        self,
+        request_id: str,
+        target: str | None = None,
+    ) -> bytes:
+        """Get the body of a loaded response from the tab that loaded it."""
+        current = self.current_window_handle
+        try:
+            if target is not None and target != current:
+                self.switch_to.window(target)
+            try:
+                result = self.execute_cdp_cmd(
+                    "Network.getResponseBody", {"requestId": request_id}
+                )
+            finally:
+                if target is not None and target != current:
+                    self.switch_to.window(current)
+        except WebDriverException:
+            return b""  # Evicted from the browser's buffer or tab closed.
+        if result["base64Encoded"]:
+            return base64.b64decode(result["body"])
+        return result["body"].encode()
+
+    @property
+    def requests(self) -> list[CapturedRequest]:
+        """Get the captured requests, oldest first."""
+        self._drain_log()
+        return list(self._requests.values())
+
+    @requests.deleter
+    def requests(self) -> None:
+        """Forget the captured requests."""
+        self._drain_log()
+        self._requests.clear()
+        self._responses.clear()
+
+    def wait_for_request(
+        self,
+        pattern: str,
+        timeout: float = 10,
+    ) -> CapturedRequest:
+        """Wait for a request matching the pattern to get its response."""
+        deadline = time.monotonic() + timeout
+        while True:
+            for request in self.requests:
+                if request.response and re.search(pattern, request.url):
+                    return request
+            if time.monotonic() >= deadline:
+                raise TimeoutException(
+                    f"Timed out after {timeout}s waiting for request "
+                    f"matching {pattern}"
+                )
+            time.sleep(POLL_INTERVAL_SECONDS)
@@ -0,0 +1,135 @@
+"""
+This module keeps a checkpoint journal of the state of each article URL, so
+an interrupted run can resume where it left off.
+"""
+
+import json
+import logging
+import os
+import threading
+import time
+
+QUEUED = "queued"
+IN_FLIGHT = "in-flight"
+DONE = "done"
+FAILED = "failed"
+
+
+class CheckpointJournal:
+    """Append-only JSON Lines journal of article URL states.
+
+    Each line records a state change and the last line for a URL wins.
+    Lines are flushed as they are written but only synced to disk every
+    `sync_every` records or `sync_interval` seconds, so a crash loses at
+    most a few recent transitions, which are then simply scraped again.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        sync_every: int = 100,
+        sync_interval: float = 5.0,
+    ) -> None:
+        self.path = path
+        self.sync_every = sync_every
+        self.sync_interval = sync_interval
+        self.logger = logging.getLogger(self.__class__.__name__)
+        self.states: dict[str, tuple[str, str | None]] = {}
+
+        self._lock = threading.Lock()
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+        self._load()
+        self._compact()
+        self._file = open(self.path, "a", encoding="utf-8")
+
+    def _load(self) -> None:
+        """Replay the journal to get the latest state of each URL."""
+        if not os.path.exists(self.path):
+            return
+        with open(self.path, "r", encoding="utf-8") as f:
+            for line in f:
+                try:
+                    entry = json.loads(line)
+                except json.JSONDecodeError:
+                    continue  # Torn write from a crash.
+                self.states[entry["url"]] = (entry["state"], entry["reason"])
+        self.logger.info(
+            "Loaded %s URL states from %s.", len(self.states), self.path
+        )
+
+    def _compact(self) -> None:
+        """Rewrite the journal with only the latest state of each URL."""
+        temp_path = f"{self.path}.tmp"
+        with open(temp_path, "w", encoding="utf-8") as f:
+            for url, (state, reason) in self.states.items():
+                f.write(self._format(url, state, reason))
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(temp_path, self.path)
+
+    @staticmethod
+    def _format(url: str, state: str, reason: str | None) -> str:
+        """Format a journal line."""
+        entry = {"url": url, "state": state, "reason": reason}
+        return json.dumps(entry, ensure_ascii=False) + "\n"
+
+    def record(self, url: str, state: str, reason: str | None = None) -> None:
+        """Record the new state of a URL."""
+        self.record_many([url], state, reason)
+
+    def record_many(
+        self,
+        urls: list[str],
+        state: str,
+        reason: str | None = None,
+    ) -> None:
+        """Record the same new state for several URLs."""
+        with self._lock:
+            for url in urls:
+                self.states[url] = (state, reason)
+                self._file.write(self._format(url, state, reason))
+            self._file.flush()
+            self._unsynced += len(urls)
+            if (
+                self._unsynced >= self.sync_every
+                or time.monotonic() - self._synced_at >= self.sync_interval
+            ):
+                self._sync()
+
+    def _sync(self) -> None:
+        """Sync the journal to disk."""
+        os.fsync(self._file.fileno())
+        self._unsynced = 0
+        self._synced_at = time.monotonic()
+
+    def resume(self, urls: list[str]) -> list[str]:
+        """Drop the URLs already done or failed in a previous run.
+
+        URLs left queued or in flight by an interrupted run are kept.
+        """
+        remaining = [
+            url
+            for url in urls
+            if self.states.get(url, (None, None))[0] not in (DONE, FAILED)
+        ]
+        self.logger.info(
+            "Resuming with %s URLs, %s finished in previous runs.",
+            len(remaining),
+            len(urls) - len(remaining),
+        )
+        return remaining
+
+    def get_failed(self) -> dict[str, str | None]:
+        """Get the failed URLs and the reason they failed."""
+        return {
+            url: reason
+            for url, (state, reason) in self.states.items()
+            if state == FAILED
+        }
+
+    def close(self) -> None:
+        """Sync and close the journal."""
+        with self._lock:
+            self._sync()
+            self._file.close()
@@ -0,0 +1,320 @@
+"""
+This module contains the helpers used to store scraped articles in Firestore.
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable
+
+import firebase_admin
+from firebase_admin import credentials, firestore
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.firestore_v1.field_path import FieldPath
+
+COLLECTION_NAME = "articles"
+IN_QUERY_LIMIT = 30
+GET_ALL_LIMIT = 300
+MIGRATION_PAGE_SIZE = 1000
+EMULATOR_PROJECT_ID = "demo-rappler"
+
+logger = logging.getLogger(__name__)
+
+
+def init_firestore(credential_path: str):
+    """Return a Firestore client, initializing the Firebase app once.
+
+    When `FIRESTORE_EMULATOR_HOST` is set, the client talks to the local
+    emulator with anonymous credentials, so no credential file is needed.
+    """
+    if os.environ.get("FIRESTORE_EMULATOR_HOST"):
+        project_id = os.environ.get(
+            "GOOGLE_CLOUD_PROJECT", EMULATOR_PROJECT_ID
+        )
+        return firestore.Client(
+            project=project_id, credentials=AnonymousCredentials()
+        )
+    if not firebase_admin._apps:
+        cred = credentials.Certificate(credential_path)
+        firebase_admin.initialize_app(cred)
+    return firestore.client()
+
+
+def find_existing_hashes(
+    db,
+    url_hashes: list[str],
+    collection: str = COLLECTION_NAME,
+    keyed_by_hash: bool = False,
+) -> set[str]:
+    """Find the URL hashes that already have a document in Firestore.
+
+    With `keyed_by_hash`, documents are looked up directly by ID instead of
+    being queried on their `url_hash` field.
+    """
+    if keyed_by_hash:
+        existing = find_existing_ids(db, url_hashes, collection)
+    else:
+        existing = query_existing_hashes(db, url_hashes, collection)
+    logger.info(
+        "Found %s of %s articles in Firestore.",
+        len(existing),
+        len(url_hashes),
+    )
+    return existing
+
+
+def find_existing_ids(
+    db,
+    doc_ids: list[str],
+    collection: str = COLLECTION_NAME,
+) -> set[str]:
+    """Find the document IDs that exist in the collection."""
+    existing = set()
+    collection_ref = db.collection(collection)
+    for start in range(0, len(doc_ids), GET_ALL_LIMIT):
+        refs = [
+            collection_ref.document(doc_id)
+            for doc_id in doc_ids[start : start + GET_ALL_LIMIT]
+        ]
+        docs = db.get_all(refs, field_paths=["url_hash"])
+        existing.update(doc.id for doc in docs if doc.exists)
+    return existing
+
+
+def query_existing_hashes(
+    db,
+    url_hashes: list[str],
+    collection: str = COLLECTION_NAME,
+) -> set[str]:
+    """Find the URL hashes stored in the `url_hash` field of documents."""
+    existing = set()
+    for start in range(0, len(url_hashes), IN_QUERY_LIMIT):
+        chunk = url_hashes[start : start + IN_QUERY_LIMIT]
+        docs = (
+            db.collection(collection)
+            .where(field_path="url_hash", op_string="in", value=chunk)
+            .select(["url_hash"])
+            .get()
+        )
+        existing.update(doc.get("url_hash") for doc in docs)
+    return existing
+
+
+class FirestoreWriter:
+    """Accumulate articles and write them to Firestore in bulk.
+
+    Articles are flushed once `flush_size` are queued, or by a background
+    thread once the oldest has waited `flush_interval` seconds. With
+    `upsert`, each article is stored under its URL hash so that re-scraped
+    articles overwrite their previous document.
+    """
+
+    def __init__(
+        self,
+        db,
+        collection: str = COLLECTION_NAME,
+        flush_size: int = 500,
+        flush_interval: float = 30.0,
+        max_attempts: int = 5,
+        upsert: bool = False,
+        on_written: Callable[[list[str]], None] | None = None,
+    ) -> None:
+        self.db = db
+        self.collection = collection
+        self.upsert = upsert
+        self.flush_size = flush_size
+        self.flush_interval = flush_interval
+        self.max_attempts = max_attempts
+        self.on_written = on_written
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._lock = threading.Lock()
+        self._pending: list[dict] = []
+        self._oldest_at: float | None = None
+        self._closed = threading.Event()
+        self._flusher = threading.Thread(
+            target=self._flush_when_stale,
+            name="firestore-flusher",
+            daemon=True,
+        )
+        self._flusher.start()
+
+    def add(self, article: dict) -> None:
+        """Queue an article and flush when the batch is full."""
+        with self._lock:
+            if not self._pending:
+                self._oldest_at = time.monotonic()
+            self._pending.append(article)
+            if len(self._pending) >= self.flush_size:
+                self._flush()
+
+    def _get_flush_delay(self) -> float:
+        """Get the time left before the oldest queued article is stale."""
+        with self._lock:
+            if self._oldest_at is None:
+                return self.flush_interval
+            waited = time.monotonic() - self._oldest_at
+        return max(0.0, self.flush_interval - waited)
+
+    def _flush_when_stale(self) -> None:
+        """Flush the queued articles once the oldest has waited too long."""
+        while not self._closed.wait(self._get_flush_delay()):
+            with self._lock:
+                if (
+                    self._oldest_at is not None
+                    and time.monotonic() - self._oldest_at
+                    >= self.flush_interval
+                ):
+                    try:
+                        self._flush()
+                    except Exception as err:
+                        self.logger.error("Failed to flush articles: %s", err)
+
+    def _should_retry(self, failure, _) -> bool:
+        """Retry failed writes until the attempts are exhausted."""
+        if failure.attempts < self.max_attempts:
+            return True
+        self.logger.error(
+            "Failed to write %s to Firestore: %s",
+            failure.operation.reference.id,
+            failure.message,
+        )
+        return False
+
+    def flush(self) -> None:
+        """Write the queued articles to Firestore."""
+        with self._lock:
+            self._flush()
+
+    def _flush(self) -> None:
+        """Write the queued articles while holding the lock."""
+        if not self._pending:
+            return
+
+        articles, self._pending = self._pending, []
+        self._oldest_at = None
+        hashes_by_id = {}
+        written = []
+        lock = threading.Lock()
+
+        def record_result(reference, _, __):
+            with lock:
+                written.append(hashes_by_id[reference.id])
+
+        bulk_writer = self.db.bulk_writer()
+        bulk_writer.on_write_result(record_result)
+        bulk_writer.on_write_error(self._should_retry)
+        collection = self.db.collection(self.collection)
+        for article in articles:
+            if self.upsert:
+                doc_ref = collection.document(article["url_hash"])
+            else:
+                doc_ref = collection.document()
+            hashes_by_id[doc_ref.id] = article["url_hash"]
+            bulk_writer.set(doc_ref, article)
+        bulk_writer.close()
+
+        self.logger.info(
+            "Wrote %s of %s articles to Firestore.",
+            len(written),
+            len(articles),
+        )
+        if self.on_written is not None:
+            self.on_written(written)
+
+    def close(self) -> None:
+        """Stop the background flushes and write the remaining articles."""
+        self._closed.set()
+        self._flusher.join()
+        self.flush()
+
+
+def migrate_to_url_hash_ids(
+    db,
+    collection: str = COLLECTION_NAME,
+    dry_run: bool = False,
+) -> Counter[str]:
+    """Rekey the articles by URL hash and drop duplicate documents.
+
+    The most recently updated document of each URL hash is copied to the
+    document named after the hash before the other documents are deleted,
+    so an interrupted migration can simply be run again.
+    """
+    collection_ref = db.collection(collection)
+    latest = {}
+    duplicates = []
+    stats = Counter()
+
+    last_doc = None
+    while True:
+        query = (
+            collection_ref.order_by(FieldPath.document_id())
+            .select(["url_hash"])
+            .limit(MIGRATION_PAGE_SIZE)
+        )
+        if last_doc is not None:
+            query = query.start_after(last_doc)
+        docs = query.get()
+        if not docs:
+            break
+        last_doc = docs[-1]
+
+        for doc in docs:
+            stats["scanned"] += 1
+            url_hash = doc.get("url_hash")
+            current = latest.get(url_hash)
+            if current is None or doc.update_time > current.update_time:
+                latest[url_hash] = doc
+                doc = current
+            if doc is not None:
+                duplicates.append(doc)
+        logger.info("Scanned %s documents...", stats["scanned"])
+
+    moves = [doc for url_hash, doc in latest.items() if doc.id != url_hash]
+    # The document already named after its hash is overwritten, not deleted.
+    deletions = [
+        doc for doc in duplicates + moves if doc.id != doc.get("url_hash")
+    ]
+    stats["moved"] = len(moves)
+    stats["deleted"] = len(deletions) - len(moves)
+    logger.info(
+        "Moving %s documents and deleting %s duplicates.",
+        stats["moved"],
+        stats["deleted"],
+    )
+    if dry_run:
+        return stats
+
+    failed_hashes = set()
+
+    def should_retry(failure, _):
+        if failure.attempts < 5:
+            return True
+        failed_hashes.add(failure.operation.reference.id)
+        logger.error(
+            "Failed to write %s: %s",
+            failure.operation.reference.id,
+            failure.message,
+        )
+        return False
+
+    bulk_writer = db.bulk_writer()
+    bulk_writer.on_write_error(should_retry)
+    for start in range(0, len(moves), GET_ALL_LIMIT):
+        refs = [doc.reference for doc in moves[start : start + GET_ALL_LIMIT]]
+        for doc in db.get_all(refs):
+            url_hash = doc.get("url_hash")
+            bulk_writer.set(collection_ref.document(url_hash), doc.to_dict())
+    bulk_writer.close()
+
+    # Only delete documents whose rekeyed copy is known to be written.
+    bulk_writer = db.bulk_writer()
+    for doc in deletions:
+        if doc.get("url_hash") in failed_hashes:
+            stats["kept"] += 1
+            continue
+        bulk_writer.delete(doc.reference)
+    bulk_writer.close()
+    return stats
@@ -4,147 +4,478 @@ website. It uses Selenium to navigate the website and extract article data.
 """
 
 import argparse
-import hashlib
+import asyncio
+import copy
 import json
 import logging
-import multiprocessing as mp
+import math
 import os
+import re
+import threading
 import time
+from contextlib import contextmanager
+from dataclasses import dataclass, field
 from functools import partial
+from typing import ClassVar
 
-import firebase_admin
-from firebase_admin import credentials, firestore
+from lxml import etree
+from lxml import html as lxml_html
 from selenium.common.exceptions import TimeoutException, WebDriverException
 from selenium.webdriver.common.by import By
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.support.ui import WebDriverWait
 from seleniumwire import webdriver
 
+import article_url_scraper
+from adaptive_timeout import AdaptiveTimeouts
+from async_runner import AsyncRunner
+from article_index import (
+    FIRESTORE_STATUS,
+    LOCAL_STATUSES,
+    ArticleIndex,
+    hash_url,
+)
+from article_url_scraper import (
+    LastmodStore,
+    collect_article_urls,
+    collect_modified_article_urls,
+    get_response,
+)
+from cdp_driver import REQUEST_STORAGE_MAX_SIZE, CdpChrome, block_urls
+from checkpoint import DONE, FAILED, IN_FLIGHT, QUEUED, CheckpointJournal
+import firestore_store
+from firestore_store import (
+    FirestoreWriter,
+    find_existing_hashes,
+    init_firestore,
+)
+from mood_client import VOTE_API_ENDPOINT, MoodClient, extract_post_id
+from retry import RetryPolicy
+from scheduler import ProgressReporter, Scheduler
+from tab_pool import TabPool
+from work_queue import POLL_INTERVAL_SECONDS, open_queue
 
+BLOCK_TAGS = {
+    "article",
+    "blockquote",
+    "br",
+    "div",
+    "figcaption",
+    "figure",
+    "h1",
+    "h2",
+    "h3",
+    "h4",
+    "h5",
+    "h6",
+    "hr",
+    "li",
+    "ol",
+    "p",
+    "pre",
+    "section",
+    "table",
+    "tr",
+    "ul",
+}
+BLOCKED_EXTENSIONS = {
+    ".avi",
+    ".eot",
+    ".gif",
+    ".ico",
+    ".jpeg",
+    ".jpg",
+    ".m3u8",
+    ".mov",
+    ".mp3",
+    ".mp4",
+    ".otf",
+    ".png",
+    ".svg",
+    ".ttf",
+    ".webm",
+    ".webp",
+    ".woff",
+    ".woff2",
+}
+# Chrome can only block wildcard patterns, so these well-known ad and
+# analytics hosts are blocked instead of every third party.
+AD_HOSTS = [
+    "adnxs.com",
+    "amazon-adsystem.com",
+    "chartbeat.com",
+    "chartbeat.net",
+    "criteo.com",
+    "doubleclick.net",
+    "facebook.net",
+    "google-analytics.com",
+    "googlesyndication.com",
+    "googletagmanager.com",
+    "googletagservices.com",
+    "hotjar.com",
+    "outbrain.com",
+    "scorecardresearch.com",
+    "taboola.com",
+]
+CAPTURE_SCOPE = [re.escape(VOTE_API_ENDPOINT)]
+
+
+@dataclass(slots=True, eq=False)
 class ArticleData:
     """Class to store article data."""
 
-    def __init__(
-        self,
-        url,
-        title=None,
-        datetime=None,
-        content=None,
-        moods=None,
-    ):
-        self.url = url
-        self.url_hash = hashlib.sha256(url.encode()).hexdigest()
-        self.title = title
-        self.datetime = datetime
-        self.content = content
-        self.moods = moods
+    FIELDS: ClassVar[tuple[str, ...]] = (
+        "url",
+        "url_hash",
+        "title",
+        "datetime",
+        "content",
+        "moods",
+    )
+
+    url: str
+    url_hash: str = field(init=False)
+    title: str | None = None
+    datetime: str | None = None
+    content: str | None = None
+    moods: dict | None = None
+
+    def __post_init__(self):
+        self.url_hash = hash_url(self.url)
+
+    def missing_fields(self):
+        """List the fields that could not be scraped."""
+        return [name for name in self.FIELDS if getattr(self, name) is None]
 
     def is_complete(self):
         """Check if the article data is complete."""
-        return all(value is not None for value in vars(self).values())
+        return not self.missing_fields()
 
     def to_json(self):
         """Convert the article data to a JSON string."""
-        return json.dumps(vars(self), indent=4, ensure_ascii=False)
+        return json.dumps(self.to_dict(), indent=4, ensure_ascii=False)
 
     def to_dict(self):
         """Convert the article data to a dictionary."""
-        return vars(self)
+        return {name: getattr(self, name) for name in self.FIELDS}
 
     def save(self, output_dir):
         """Save the article data to a JSON file."""
-        url_hash = hashlib.sha256(self.url.encode()).hexdigest()
         directory = os.path.join(
             output_dir,
             "complete" if self.is_complete() else "incomplete",
         )
         os.makedirs(directory, exist_ok=True)
-        filename = os.path.join(directory, f"{url_hash}.json")
+        filename = os.path.join(directory, f"{self.url_hash}.json")
         with open(filename, "w", encoding="utf-8") as f:
             f.write(self.to_json())
         return filename
 
 
+def setup_logger(logger):
+    """Attach the scraper log format to the given logger once."""
+    logger.setLevel(logging.INFO)
+    if logger.handlers:  # Avoid duplicate handlers
+        return
+
+    handler = logging.StreamHandler()
+    formatter = logging.Formatter(
+        ":".join(
+            [
+                "%(asctime)s",
+                "%(levelname)s",
+                "%(name)s",
+                "%(message)s",
+            ]
+        )
+    )
+    handler.setFormatter(formatter)
+    logger.addHandler(handler)
+
+
+def get_blocked_url_patterns():
+    """Get the wildcard URL patterns blocked when blocking resources."""
+    patterns = [f"*{host}/*" for host in AD_HOSTS]
+    for extension in sorted(BLOCKED_EXTENSIONS):
+        patterns += [f"*{extension}", f"*{extension}?*"]
+    return patterns
+
+
+def create_driver(
+    disable_headless=False,
+    page_load_strategy="normal",
+    block_resources=False,
+    capture_backend="seleniumwire",
+):
+    """Launch a new Chrome WebDriver with the scraper's default options.
+
+    An `eager` or `none` page load strategy returns from `driver.get`
+    before subresources finish loading; the scrapers wait for the elements
+    they need and for the page to be parsed anyway. Only the vote API
+    requests are captured, and the `cdp` capture backend records them from
+    DevTools events instead of seleniumwire's proxy. Blocked resources are
+    blocked by Chrome itself with either backend.
+    """
+    chrome_options = webdriver.ChromeOptions()
+    chrome_options.page_load_strategy = page_load_strategy
+    if not disable_headless:
+        chrome_options.add_argument("--headless")
+    chrome_options.add_argument("--disable-extensions")
+    chrome_options.add_argument("log-level=3")
+
+    prefs = {
+        "profile.default_content_setting_values": {
+            "app_banner": 2,
+            "auto_select_certificate": 2,
+            "automatic_downloads": 2,
+            # "cookies": 2,
+            "durable_storage": 2,
+            "fullscreen": 2,
+            "geolocation": 2,
+            "images": 2,
+            # "javascript": 2,
+            "media_stream_camera": 2,
+            "media_stream_mic": 2,
+            "media_stream": 2,
+            "metro_switch_to_desktop": 2,
+            "midi_sysex": 2,
+            # "mixed_script": 2,
+            "mouselock": 2,
+            "notifications": 2,
+            "plugins": 2,
+            "popups": 2,
+            "ppapi_broker": 2,
+            "protected_media_identifier": 2,
+            "protocol_handlers": 2,
+            "push_messaging": 2,
+            "site_engagement": 2,
+            "ssl_cert_decisions": 2,
+        }
+    }
+    chrome_options.add_experimental_option("prefs", prefs)
+
+    if capture_backend == "cdp":
+        return CdpChrome(
+            chrome_options,
+            scope=CAPTURE_SCOPE,
+            blocked_urls=get_blocked_url_patterns() if block_resources else [],
+            max_requests=REQUEST_STORAGE_MAX_SIZE,
+        )
+
+    driver = webdriver.Chrome(
+        options=chrome_options,
+        seleniumwire_options={
+            "request_storage": "memory",
+            "request_storage_max_size": REQUEST_STORAGE_MAX_SIZE,
+        },
+    )
+    driver.scope = CAPTURE_SCOPE
+    if block_resources:
+        # Blocked before reaching seleniumwire, which would store them and
+        # evict the vote API requests from its storage.
+        driver.setup_current_tab = partial(
+            block_urls, driver, get_blocked_url_patterns()
+        )
+        driver.setup_current_tab()
+    return driver
+
+
+def find_by_class(tree, class_name):
+    """Return the first element in the tree having the given class."""
+    elements = tree.xpath(
+        "//*[contains(concat(' ', normalize-space(@class), ' '), $name)]",
+        name=f" {class_name} ",
+    )
+    return elements[0] if elements else None
+
+
+def element_text(element):
+    """Extract the text of an element the way a browser would render it."""
+    element = copy.deepcopy(element)
+    etree.strip_elements(
+        element, "script", "style", "noscript", with_tail=False
+    )
+    for child in element.iter(*BLOCK_TAGS):
+        child.tail = "\n" + (child.tail or "")
+    lines = (
+        " ".join(line.split()) for line in element.text_content().splitlines()
+    )
+    return "\n".join(line for line in lines if line)
+
+
+def is_transient_navigation_error(err):
+    """Check if the page load failed for a reason worth retrying."""
+    if isinstance(err, TimeoutException):
+        return True
+    return isinstance(err, WebDriverException) and "net::ERR_" in str(err)
+
+
+class DriverPool:
+    """Pool of long-lived WebDriver instances shared across scrapers.
+
+    Drivers are launched lazily up to `size`, health-checked before they are
+    handed out, and recycled after `max_pages` articles or when a scraper
+    reports a crash, so browser startup is paid only a handful of times per
+    batch instead of once per article. Extra keyword arguments are passed
+    to `create_driver`.
+    """
+
+    def __init__(self, size=1, max_pages=100, **driver_options):
+        self.size = size
+        self.max_pages = max_pages
+        self.driver_options = driver_options
+        self.logger = logging.getLogger(self.__class__.__name__)
+        setup_logger(self.logger)
+
+        self._slots = threading.BoundedSemaphore(size)
+        self._lock = threading.Lock()
+        self._idle = []
+        self._drivers = {}
+        self._page_counts = {}
+        self._borrowers = {}
+
+    def _launch(self):
+        """Launch a new driver and start tracking its page count."""
+        self.logger.info("Launching a new browser...")
+        driver = create_driver(**self.driver_options)
+        with self._lock:
+            self._drivers[id(driver)] = driver
+            self._page_counts[id(driver)] = 0
+        return driver
+
+    def _is_healthy(self, driver):
+        """Check that the driver still responds to commands."""
+        try:
+            driver.execute_script("return 1;")
+            return True
+        except WebDriverException:
+            return False
+
+    def discard(self, driver):
+        """Quit the driver and stop tracking it."""
+        with self._lock:
+            self._drivers.pop(id(driver), None)
+            self._page_counts.pop(id(driver), None)
+        try:
+            driver.quit()
+        except WebDriverException as we:
+            self.logger.warning("Failed to quit browser cleanly: %s", we)
+
+    def _checkout(self):
+        """Return a healthy driver, reusing an idle one when possible."""
+        while True:
+            with self._lock:
+                driver = self._idle.pop() if self._idle else None
+            if driver is None:
+                return self._launch()
+            if self._is_healthy(driver):
+                return driver
+            self.logger.warning("Discarding unresponsive browser.")
+            self.discard(driver)
+
+    def _checkin(self, driver):
+        """Return the driver to the pool or recycle it when worn out."""
+        with self._lock:
+            if id(driver) not in self._drivers:
+                return  # Already discarded while it was borrowed.
+            self._page_counts[id(driver)] += 1
+            worn_out = self._page_counts[id(driver)] >= self.max_pages
+        if worn_out:
+            self.logger.info(
+                "Recycling browser after %s pages.",
+                self.max_pages,
+            )
+            self.discard(driver)
+            return
+        try:
+            # Unload the previous article, so that with the `none` page
+            # load strategy it is not read under the URL of the next one.
+            driver.get("about:blank")
+            del driver.requests  # Captured for the previous article.
+        except WebDriverException:
+            self.logger.warning("Discarding unresponsive browser.")
+            self.discard(driver)
+            return
+        with self._lock:
+            self._idle.append(driver)
+
+    @contextmanager
+    def borrow(self):
+        """Borrow a driver for the duration of the `with` block.
+
+        If the block raises and the driver no longer responds, it is treated
+        as crashed and discarded instead of being returned to the pool.
+        """
+        self._slots.acquire()
+        driver = None
+        try:
+            driver = self._checkout()
+            with self._lock:
+                self._borrowers[threading.get_ident()] = driver
+            yield driver
+        except Exception:
+            if driver is not None and not self._is_healthy(driver):
+                self.logger.warning("Discarding crashed browser.")
+                self.discard(driver)
+                driver = None
+            raise
+        finally:
+            with self._lock:
+                self._borrowers.pop(threading.get_ident(), None)
+            if driver is not None:
+                self._checkin(driver)
+            self._slots.release()
+
+    def discard_borrowed(self, thread):
+        """Quit the driver borrowed by a stuck thread to unblock it."""
+        with self._lock:
+            driver = self._borrowers.get(thread.ident)
+        if driver is not None:
+            self.logger.warning("Killing browser of %s.", thread.name)
+            self.discard(driver)
+
+    def close(self):
+        """Quit every driver of the pool, including borrowed ones."""
+        with self._lock:
+            drivers = list(self._drivers.values())
+            self._idle = []
+        for driver in drivers:
+            self.discard(driver)
+
+
 class BaseScraper:
     """Base class for web scraping using Selenium."""
 
     TIMEOUT_SECONDS = 120
+    RETRY_POLICY = RetryPolicy(is_transient_navigation_error)
+    ADAPTIVE_TIMEOUTS = None
 
-    def __init__(self, disable_headless=False):
+    def __init__(self):
         self.logger = logging.getLogger(self.__class__.__name__)
         self.setup_logger()
 
-        chrome_options = webdriver.ChromeOptions()
-        if not disable_headless:
-            chrome_options.add_argument("--headless")
-        chrome_options.add_argument("--disable-extensions")
-        chrome_options.add_argument("log-level=3")
-
-        prefs = {
-            "profile.default_content_setting_values": {
-                "app_banner": 2,
-                "auto_select_certificate": 2,
-                "automatic_downloads": 2,
-                # "cookies": 2,
-                "durable_storage": 2,
-                "fullscreen": 2,
-                "geolocation": 2,
-                "images": 2,
-                # "javascript": 2,
-                "media_stream_camera": 2,
-                "media_stream_mic": 2,
-                "media_stream": 2,
-                "metro_switch_to_desktop": 2,
-                "midi_sysex": 2,
-                # "mixed_script": 2,
-                "mouselock": 2,
-                "notifications": 2,
-                "plugins": 2,
-                "popups": 2,
-                "ppapi_broker": 2,
-                "protected_media_identifier": 2,
-                "protocol_handlers": 2,
-                "push_messaging": 2,
-                "site_engagement": 2,
-                "ssl_cert_decisions": 2,
-            }
-        }
-        chrome_options.add_experimental_option("prefs", prefs)
-
-        self.driver = webdriver.Chrome(options=chrome_options)
+        self.driver = None  # Borrowed from the driver pool when needed.
 
     def setup_logger(self):
         """Setup the logger for the scraper."""
-        handler = logging.StreamHandler()
-        formatter = logging.Formatter(
-            ":".join(
-                [
-                    "%(asctime)s",
-                    "%(levelname)s",
-                    "%(name)s",
-                    "%(message)s",
-                ]
-            )
-        )
-        handler.setFormatter(formatter)
-        self.logger.addHandler(handler)
-        self.logger.setLevel(logging.INFO)
-
-        if not self.logger.hasHandlers():  # Avoid duplicate handlers
-            self.logger.addHandler(handler)
+        setup_logger(self.logger)
 
     def navigate_to_url(self, url):
-        """Navigate to the given URL."""
-        self.driver.get(url)
-
-    def get_urls(self, condition):
-        """Extract URLs from the current page based on the given condition."""
-        urls = []
-        for a_tag in self.driver.find_elements(By.TAG_NAME, "a"):
-            url = a_tag.get_attribute("href")
-            if condition(url):
-                urls.append(url)
-        return urls
+        """Navigate to the given URL, retrying transient failures."""
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                self.driver.get(url)
+                return
+            except WebDriverException as err:
+                if not self.RETRY_POLICY.should_retry(attempt, err):
+                    raise
+                delay = self.RETRY_POLICY.get_delay(attempt)
+                self.logger.warning(
+                    "Retrying %s in %.1fs after error: %s", url, delay, err
+                )
+                time.sleep(delay)
 
     def wait_for_element(
         self,
@@ -152,65 +483,46 @@ class BaseScraper:
         by=By.CSS_SELECTOR,
         wait_time=TIMEOUT_SECONDS,
     ):
-        """Wait for the element to be present in the DOM."""
-        return WebDriverWait(self.driver, wait_time).until(
+        """Wait for the element to be present in the DOM.
+
+        With adaptive timeouts, the wait time is learned from the previous
+        waits for the same element, up to the given one.
+        """
+        if self.ADAPTIVE_TIMEOUTS is None:
+            return WebDriverWait(self.driver, wait_time).until(
+                EC.presence_of_element_located((by, identifier))
+            )
+
+        wait_time = self.ADAPTIVE_TIMEOUTS.get(identifier, wait_time)
+        started_at = time.monotonic()
+        element = WebDriverWait(self.driver, wait_time).until(
             EC.presence_of_element_located((by, identifier))
         )
+        self.ADAPTIVE_TIMEOUTS.observe(
+            identifier, time.monotonic() - started_at
+        )
+        return element
+
+    def wait_for_parsed_page(self, wait_time=TIMEOUT_SECONDS):
+        """Wait for the whole HTML of the page to be parsed.
+
+        With the `eager` or `none` page load strategy, an element is found
+        as soon as its opening tag is parsed, before its content is.
+        """
+        WebDriverWait(self.driver, wait_time).until(
+            lambda driver: driver.execute_script("return document.readyState")
+            != "loading"
+        )
 
     def click_element_via_js(self, identifier, by=By.CSS_SELECTOR):
         """Click the element using JavaScript."""
         element = self.wait_for_element(identifier, by=by)
         self.driver.execute_script("arguments[0].click();", element)
 
-    def quit_driver(self):
-        """Quit the WebDriver."""
-        self.driver.quit()
-
-
-class SitemapScraper(BaseScraper):
-    """Scrape article URLs from the sitemaps of Rappler website."""
-
-    BASE_URL = "https://www.rappler.com"
-
-    def __init__(self, main_sitemap_url):
-        super().__init__()
-        self.main_sitemap_url = main_sitemap_url
-
-    def _get_post_sitemaps(self):
-        """Extract post sitemaps from the main sitemap."""
-        self.logger.info(
-            "Fetching post sitemaps from %s...",
-            self.main_sitemap_url,
-        )
-        self.navigate_to_url(self.main_sitemap_url)
-        return self.get_urls(lambda url: "post-sitemap" in url)
-
-    def _get_article_urls(self, sitemap):
-        """Extract article URLs from the given sitemap."""
-        self.logger.info("Fetching article URLs from %s...", sitemap)
-        self.navigate_to_url(sitemap)
-        return self.get_urls(lambda url: url.startswith(self.BASE_URL))
-
-    def scrape_sitemap(self, max_url=None):
-        """Scrape certain number of article URLs from the sitemaps."""
-        self.logger.info("Scraping article URLs from sitemaps...")
-        post_sitemaps = self._get_post_sitemaps()
-        article_urls = []
-        for sitemap in post_sitemaps:
-            new_urls = self._get_article_urls(sitemap)
-            article_urls.extend(new_urls)
-            if max_url is not None and len(article_urls) >= max_url:
-                article_urls = article_urls[:max_url]
-                break
-        self.quit_driver()
-        self.logger.info("Scraped %s article URLs.", len(article_urls))
-        return article_urls
-
 
 class RapplerScraper(BaseScraper):
     """Scrape article data from Rappler website."""
 
-    COLLECTION_NAME = "articles"
     ARTICLE_TITLE_CSS = ".post-single__title"
     ARTICLE_CONTENT_CSS = ".post-single__content"
     ARTICLE_DATETIME_CSS = ".post__timeago"
@@ -218,48 +530,53 @@ class RapplerScraper(BaseScraper):
     SEE_MOODS_CSS = r".AOhvJlN4Z5TsLqKZb1kSBw\=\="
     VOTE_DIV_CSS = r".i1IMtjULF3BKu3lB0m1ilg\=\="
     HAPPY_DIV_CSS = ".mood-happy"
-    VOTE_API_ENDPOINT = "/api/v1/votes"
     SEE_MOODS_TIMEOUT_SECONDS = 30
+    VOTE_REQUEST_TIMEOUT_SECONDS = 10
+    TEXT_FIELDS_CSS = {
+        "title": ARTICLE_TITLE_CSS,
+        "datetime": ARTICLE_DATETIME_CSS,
+        "content": ARTICLE_CONTENT_CSS,
+    }
+    EXTRACT_FIELDS_SCRIPT = """
+        const [selectors, contentCss, withParagraphs] = arguments;
+        const fields = {};
+        for (const [field, css] of Object.entries(selectors)) {
+            const element = document.querySelector(css);
+            fields[field] = element ? element.innerText.trim() : null;
+        }
+        if (withParagraphs) {
+            const content = document.querySelector(contentCss);
+            fields.paragraphs = content
+                ? Array.from(
+                      content.querySelectorAll("p"),
+                      (p) => p.innerText.trim(),
+                  ).filter(Boolean)
+                : null;
+        }
+        return fields;
+    """
 
     def __init__(
         self,
         article_url,
         output_dir,
-        ignore_cache,
         save_to_firestore,
-        firebase_credential_path,
-        disable_headless,
+        driver_pool,
+        http_fast_path=False,
+        mood_client=None,
+        article_index=None,
+        async_runner=None,
     ):
-        super().__init__(disable_headless=disable_headless)
+        super().__init__()
         self.article_data = ArticleData(article_url)
+        self.post_id = None
+        self.driver_pool = driver_pool
+        self.http_fast_path = http_fast_path
+        self.mood_client = mood_client
+        self.article_index = article_index
+        self.async_runner = async_runner
         self.output_dir = output_dir
-        self.ignore_cache = ignore_cache
         self.save_to_firestore = save_to_firestore
-        self.firebase_credential_path = firebase_credential_path
-
-        cred = credentials.Certificate(self.firebase_credential_path)
-        if not firebase_admin._apps:
-            firebase_admin.initialize_app(cred)
-        self.db = firestore.client()
-
-    def _is_article_in_local(self):
-        url_hash = self.article_data.url_hash
-        for subdir in ["complete", "incomplete"]:
-            directory = os.path.join(self.output_dir, subdir)
-            if os.path.exists(os.path.join(directory, f"{url_hash}.json")):
-                return True
-        return False
-
-    def _is_article_in_firestore(self):
-        """Check if the article already exists in Firestore."""
-        url_hash = self.article_data.url_hash
-        docs = (
-            self.db.collection(self.COLLECTION_NAME)
-            .where(field_path="url_hash", op_string="==", value=url_hash)
-            .limit(1)
-            .get()
-        )
-        return len(docs) > 0
 
     def _emulate_voting(self):
         """Cast a vote on the mood to see reactions."""
@@ -272,22 +589,19 @@ class RapplerScraper(BaseScraper):
             raise TimeoutException
 
     def _fetch_mood_data_from_requests(self):
-        """Fetch mood data from the requests."""
+        """Fetch mood data from the captured vote API request."""
         self.logger.info("Fetching mood data from requests...")
-        mood_data = None
-        for request in self.driver.requests:
-            if request.response and self.VOTE_API_ENDPOINT in request.url:
-                self.logger.info(
-                    "Vote API response received from %s.",
-                    request.url,
-                )
-                raw_data = json.loads(
-                    request.response.body.decode("utf-8", "ignore")
-                )
-                raw_data = raw_data["data"]["mood_count"]
-                mood_data = {k.lower(): v for k, v in raw_data.items()}
-                break
-        return mood_data
+        try:
+            request = self.driver.wait_for_request(
+                re.escape(VOTE_API_ENDPOINT),
+                timeout=self.VOTE_REQUEST_TIMEOUT_SECONDS,
+            )
+        except TimeoutException:
+            return None
+        self.logger.info("Vote API response received from %s.", request.url)
+        raw_data = json.loads(request.response.body.decode("utf-8", "ignore"))
+        raw_data = raw_data["data"]["mood_count"]
+        return {k.lower(): v for k, v in raw_data.items()}
 
     def _fetch_title(self):
         """Fetch title from the article."""
@@ -310,8 +624,91 @@ class RapplerScraper(BaseScraper):
             self.ARTICLE_CONTENT_CSS
         ).text
 
+    def extract_fields(self, fields, with_paragraphs=False):
+        """Extract the text of the given fields in a single round trip.
+
+        Fields whose element is not in the page are `None`. With
+        `with_paragraphs`, the non-empty paragraphs of the content are also
+        returned under `paragraphs`.
+        """
+        selectors = {field: self.TEXT_FIELDS_CSS[field] for field in fields}
+        return self.driver.execute_script(
+            self.EXTRACT_FIELDS_SCRIPT,
+            selectors,
+            self.ARTICLE_CONTENT_CSS,
+            with_paragraphs,
+        )
+
+    def _fetch_text_fields(self):
+        """Fetch the missing title, datetime and content from the page.
+
+        The content is waited for once, along with the rest of the page,
+        then all fields are read with a single script. A field missing at
+        that point is waited for on its own, unless the content itself
+        never appeared or the page was never fully parsed.
+        """
+        missing = [
+            field
+            for field in self.TEXT_FIELDS_CSS
+            if getattr(self.article_data, field) is None
+        ]
+        if not missing:
+            return
+
+        self.logger.info("Fetching %s...", ", ".join(missing))
+        content_timeout = None
+        try:
+            self.wait_for_element(self.ARTICLE_CONTENT_CSS)
+            self.wait_for_parsed_page()
+        except TimeoutException as te:
+            content_timeout = te
+
+        fields = self.extract_fields(missing)
+        if content_timeout is not None and "content" in fields:
+            fields["content"] = None  # Possibly truncated.
+        for field in missing:
+            if fields[field] is not None:
+                setattr(self.article_data, field, fields[field])
+            elif content_timeout is None:
+                self.logger.info("No %s yet, waiting for it...", field)
+                getattr(self, f"_fetch_{field}")()
+
+        if content_timeout is not None:
+            raise content_timeout
+
+    def _fetch_static_fields(self):
+        """Fetch server-rendered fields from the article HTML over HTTP."""
+        self.logger.info("Fetching article HTML over HTTP...")
+        runner = self.async_runner
+        page = runner.run(
+            get_response(self.article_data.url, runner.session, runner.limiter)
+        )
+        if page is None:
+            return
+
+        try:
+            tree = lxml_html.document_fromstring(page)
+        except (ValueError, etree.ParserError) as err:
+            self.logger.warning("Failed to parse article HTML: %s", err)
+            return
+
+        self.post_id = extract_post_id(page)
+        for field, css in self.TEXT_FIELDS_CSS.items():
+            element = find_by_class(tree, css.lstrip("."))
+            if element is not None:
+                setattr(self.article_data, field, element_text(element))
+            else:
+                self.logger.info("No static %s found, using browser.", field)
+
     def _fetch_moods(self):
         """Fetch moods from the article."""
+        if self.mood_client is not None and self.post_id is None:
+            self.post_id = extract_post_id(self.driver.page_source)
+            if self._can_fetch_moods_direct():
+                self._fetch_moods_direct()
+                if self.article_data.moods is not None:
+                    return
+
         mood_data = None
 
         try:
@@ -331,43 +728,64 @@ class RapplerScraper(BaseScraper):
 
         self.article_data.moods = mood_data
 
-    def _add_to_firestore(self):
-        """Save the article data to Firestore."""
-        if self.article_data.is_complete():
-            doc_ref = self.db.collection(self.COLLECTION_NAME).document()
-            doc_ref.set(self.article_data.to_dict())
-            self.logger.info("Saved data to Firestore with ID %s.", doc_ref.id)
-        else:
-            self.logger.warning("Incomplete data not saved to Firestore.")
+        if self.mood_client is not None and not self.mood_client.is_ready:
+            self._bootstrap_mood_client()
 
-    def scrape_and_save(self):
-        """Scrape article data and save it to a JSON file."""
-        if (
-            not self.ignore_cache
-            and self.save_to_firestore
-            and self._is_article_in_firestore()
-        ):
-            self.logger.info(
-                "Article already exists in Firestore: %s. Skipping...",
-                self.article_data.url,
-            )
-            return
+    def _can_fetch_moods_direct(self):
+        """Check if moods can be fetched without the browser."""
+        return (
+            self.mood_client is not None
+            and self.mood_client.is_ready
+            and self.post_id is not None
+        )
 
-        if not self.ignore_cache and self._is_article_in_local():
-            self.logger.info(
-                "Article already exists locally: %s. Skipping...",
-                self.article_data.url,
-            )
+    def _fetch_moods_direct(self):
+        """Fetch moods from the vote API without going through the browser.
+
+        The post is batched with the ones other scrapers request meanwhile.
+        """
+        self.logger.info("Fetching mood data from the vote API...")
+        runner = self.async_runner
+        self.article_data.moods = runner.run(
+            self.mood_client.fetch_batched(self.post_id, runner.session)
+        )
+
+    def _bootstrap_mood_client(self):
+        """Capture the vote API request of the browser for the mood client."""
+        if self.post_id is None:
+            self.logger.warning("Post ID not found, mood client not ready.")
             return
+        for request in self.driver.requests:
+            if request.response and self.mood_client.bootstrap(
+                request.method,
+                request.url,
+                dict(request.headers.items()),
+                self.post_id,
+            ):
+                return
 
+    def scrape_and_save(self):
+        """Scrape article data and save it to a JSON file.
+
+        When saving to Firestore, nothing is written here; the article data
+        is returned for the Firestore writer of the main process instead.
+        """
         self.logger.info("Scraping article from %s...", self.article_data.url)
-        self.navigate_to_url(self.article_data.url)
 
         try:
-            self._fetch_title()
-            self._fetch_datetime()
-            self._fetch_content()
-            self._fetch_moods()
+            if self.http_fast_path:
+                self._fetch_static_fields()
+
+            if self._can_fetch_moods_direct():
+                self._fetch_moods_direct()
+
+            if not self.article_data.is_complete():
+                with self.driver_pool.borrow() as driver:
+                    self.driver = driver
+                    self.navigate_to_url(self.article_data.url)
+                    self._fetch_text_fields()
+                    if self.article_data.moods is None:
+                        self._fetch_moods()
         except TimeoutException as te:
             self.logger.error(f"A timeout occurred during scraping: {te}")
         except WebDriverException as we:
@@ -377,12 +795,17 @@ class RapplerScraper(BaseScraper):
                 f"An unexpected error occurred during scraping: {e}"
             )
         finally:
-            self.quit_driver()
-            if self.save_to_firestore:
-                self._add_to_firestore()
-            else:
+            self.driver = None
+            if not self.save_to_firestore:
                 filename = self.article_data.save(self.output_dir)
                 self.logger.info("Saved data to %s.", filename)
+                if self.article_index is not None:
+                    self.article_index.record(
+                        self.article_data.url_hash,
+                        os.path.basename(os.path.dirname(filename)),
+                    )
+
+        return self.article_data
 
 
 def parse_arguments():
@@ -409,7 +832,15 @@ def parse_arguments():
         "-p",
         "--use-multiprocessing",
         action="store_true",
-        help="Use multiprocessing for scraping",
+        help="Deprecated, same as setting --workers to the CPU count",
+    )
+    parser.add_argument(
+        "-w",
+        "--workers",
+        type=int,
+        metavar="N",
+        help="Number of articles scraped concurrently",
+        default=1,
     )
     parser.add_argument(
         "-o",
@@ -456,30 +887,249 @@ def parse_arguments():
         action="store_true",
         help="Disable headless mode for the browser",
     )
-    return parser.parse_args()
+    parser.add_argument(
+        "-bp",
+        "--browser-pool-size",
+        type=int,
+        metavar="N",
+        help="Maximum number of browsers kept alive (default: workers, "
+        "divided by the tabs per browser)",
+        default=None,
+    )
+    parser.add_argument(
+        "-mp",
+        "--max-pages-per-browser",
+        type=int,
+        metavar="N",
+        help="Number of articles a browser scrapes before it is recycled",
+        default=100,
+    )
+    parser.add_argument(
+        "-hf",
+        "--http-fast-path",
+        action="store_true",
+        help="Fetch server-rendered fields over HTTP instead of the browser",
+    )
+    parser.add_argument(
+        "-dm",
+        "--direct-moods",
+        action="store_true",
+        help="Fetch moods directly from the vote API when possible",
+    )
+    parser.add_argument(
+        "-ma",
+        "--max-attempts",
+        type=int,
+        metavar="N",
+        help="Maximum attempts for a page or request with transient errors",
+        default=4,
+    )
+    parser.add_argument(
+        "-in",
+        "--incremental",
+        action="store_true",
+        help="Only scrape articles new or modified since the previous run",
+    )
+    parser.add_argument(
+        "-lp",
+        "--lastmod-path",
+        metavar="PATH",
+        help="SQLite file storing the lastmod seen by incremental runs",
+        default="sitemap_lastmod.sqlite3",
+    )
+    parser.add_argument(
+        "-fs",
+        "--firestore-flush-size",
+        type=int,
+        metavar="N",
+        help="Number of articles written to Firestore per bulk flush",
+        default=500,
+    )
+    parser.add_argument(
+        "-fi",
+        "--firestore-flush-interval",
+        type=float,
+        metavar="SECONDS",
+        help="Maximum time articles wait before being flushed to Firestore",
+        default=30.0,
+    )
+    parser.add_argument(
+        "-up",
+        "--upsert",
+        action="store_true",
+        help="Key Firestore documents by URL hash, overwriting re-scrapes",
+    )
+    parser.add_argument(
+        "-cs",
+        "--chunk-size",
+        type=int,
+        metavar="N",
+        help="Number of articles handed to a worker at a time",
+        default=1,
+    )
+    parser.add_argument(
+        "-tt",
+        "--task-timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Time after which a stuck article is failed and its browser "
+        "killed",
+        default=900.0,
+    )
+    parser.add_argument(
+        "-pi",
+        "--progress-interval",
+        type=float,
+        metavar="SECONDS",
+        help="Interval between progress reports",
+        default=10.0,
+    )
+    parser.add_argument(
+        "-cp",
+        "--checkpoint",
+        metavar="PATH",
+        help="Journal of URL states used to resume an interrupted run",
+        default=None,
+    )
+    parser.add_argument(
+        "-rf",
+        "--retry-failed",
+        action="store_true",
+        help="Only scrape the URLs that failed according to the checkpoint",
+    )
+    parser.add_argument(
+        "-r",
+        "--role",
+        choices=["standalone", "coordinator", "worker"],
+        help="Scrape alone, publish URLs to the work queue, or scrape URLs "
+        "leased from it",
+        default="standalone",
+    )
+    parser.add_argument(
+        "-q",
+        "--queue-url",
+        metavar="URL",
+        help="Work queue shared by the coordinator and workers "
+        "(redis://... or sqlite:///PATH)",
+        default="sqlite:///work_queue.sqlite3",
+    )
+    parser.add_argument(
+        "-vt",
+        "--visibility-timeout",
+        type=float,
+        metavar="SECONDS",
+        help="Time after which a URL leased by a dead worker is handed out "
+        "again",
+        default=3600.0,
+    )
+    parser.add_argument(
+        "-pl",
+        "--page-load-strategy",
+        choices=["normal", "eager", "none"],
+        help="When page navigation returns: after the full load, after the "
+        "DOM is ready, or right away",
+        default="normal",
+    )
+    parser.add_argument(
+        "-br",
+        "--block-resources",
+        action="store_true",
+        help="Block ad and analytics hosts, fonts, images and media",
+    )
+    parser.add_argument(
+        "-cb",
+        "--capture-backend",
+        choices=["seleniumwire", "cdp"],
+        help="Capture the vote API through seleniumwire's proxy or Chrome "
+        "DevTools events",
+        default="seleniumwire",
+    )
+    parser.add_argument(
+        "-at",
+        "--adaptive-timeouts",
+        metavar="PATH",
+        help="JSON file of observed wait durations used to shorten element "
+        "timeouts",
+        default=None,
+    )
+    parser.add_argument(
+        "-tb",
+        "--tabs-per-browser",
+        type=int,
+        metavar="N",
+        help="Number of articles a browser loads concurrently in its own "
+        "tabs, forcing the 'none' page load strategy when above 1",
+        default=1,
+    )
+    args = parser.parse_args()
+    if args.retry_failed and not args.checkpoint:
+        parser.error("--retry-failed requires --checkpoint")
+    return args
 
 
-def scraping_wrapper(url, args):
+def scraping_wrapper(
+    url, args, driver_pool, mood_client, article_index, journal, async_runner
+):
     """Wrapper function for scraping articles."""
-    RapplerScraper(
+    if journal is not None:
+        journal.record(url, IN_FLIGHT)
+    return RapplerScraper(
         url,
         args.output_directory,
-        args.ignore_cache,
         args.save_to_firestore,
-        args.firebase_credential_path,
-        args.disable_headless,
+        driver_pool,
+        http_fast_path=args.http_fast_path,
+        mood_client=mood_client,
+        article_index=article_index,
+        async_runner=async_runner,
     ).scrape_and_save()
 
 
 if __name__ == "__main__":
     args = parse_arguments()
+    BaseScraper.RETRY_POLICY.max_attempts = args.max_attempts
+    article_url_scraper.RETRY_POLICY.max_attempts = args.max_attempts
+    setup_logger(article_url_scraper.logger)
+    setup_logger(firestore_store.logger)
+    if args.adaptive_timeouts:
+        BaseScraper.ADAPTIVE_TIMEOUTS = AdaptiveTimeouts(
+            args.adaptive_timeouts
+        )
+        setup_logger(BaseScraper.ADAPTIVE_TIMEOUTS.logger)
+
+    journal = None
+    if args.checkpoint:
+        journal = CheckpointJournal(args.checkpoint)
+        setup_logger(journal.logger)
 
-    if args.urls_file:
+    work_queue = None
+    if args.role != "standalone":
+        work_queue = open_queue(args.queue_url, args.visibility_timeout)
+        setup_logger(work_queue.logger)
+
+    lastmod_store = None
+    if args.role == "worker":
+        article_urls = []  # Leased from the work queue instead.
+    elif args.retry_failed:
+        article_urls = list(journal.get_failed())
+    elif args.urls_file:
         with open(args.urls_file, "r", encoding="utf-8") as f:
             article_urls = [line.strip() for line in f.readlines()]
+    elif args.incremental:
+        lastmod_store = LastmodStore(args.lastmod_path)
+        article_urls = asyncio.run(
+            collect_modified_article_urls(
+                lastmod_store,
+                args.sitemap_url,
+                max_url=args.max_articles,
+            )
+        )
     else:
-        scraper = SitemapScraper(args.sitemap_url)
-        article_urls = scraper.scrape_sitemap(max_url=args.max_articles)
+        article_urls = asyncio.run(
+            collect_article_urls(args.sitemap_url, max_url=args.max_articles)
+        )
+    # A URL may be listed twice, e.g. in two sitemaps.
+    article_urls = list(dict.fromkeys(article_urls))
 
     if args.save_urls:
         time_now = int(time.time())
@@ -487,13 +1137,215 @@ if __name__ == "__main__":
         with open(filename, "w", encoding="utf-8") as f:
             f.write("\n".join(article_urls))
 
-    if args.use_multiprocessing:
-        workers = mp.cpu_count()
-        with mp.Pool(processes=workers) as pool:
-            pool.map(
-                partial(scraping_wrapper, args=args),
-                article_urls,
+    index = ArticleIndex(args.output_directory)
+    setup_logger(index.logger)
+    # URLs of the articles waiting to be written to Firestore, by hash.
+    unwritten_urls = {}
+
+    def mark_done(urls):
+        if journal is not None:
+            journal.record_many(urls, DONE)
+        if lastmod_store is not None:
+            lastmod_store.mark_scraped(urls)
+        if work_queue is not None:
+            for url in urls:
+                work_queue.complete(url)
+
+    def mark_failed(url, reason):
+        if journal is not None:
+            journal.record(url, FAILED, reason)
+        if work_queue is not None:
+            work_queue.fail(url, reason)
+
+    def on_written(hashes):
+        index.record_many([(h, FIRESTORE_STATUS) for h in hashes])
+        # A hash written twice in a flush, e.g. after a lease expired, is
+        # only pending once.
+        urls = [unwritten_urls.pop(h, None) for h in hashes]
+        mark_done([url for url in urls if url is not None])
+
+    writer = None
+    if args.save_to_firestore:
+        db = init_firestore(args.firebase_credential_path)
+        if args.role != "coordinator":
+            writer = FirestoreWriter(
+                db,
+                flush_size=args.firestore_flush_size,
+                flush_interval=args.firestore_flush_interval,
+                upsert=args.upsert,
+                on_written=on_written,
+            )
+            setup_logger(writer.logger)
+
+    total_urls = len(article_urls)
+    found_urls = article_urls
+    if journal is not None and not args.retry_failed:
+        article_urls = journal.resume(article_urls)
+    if not args.ignore_cache and not args.retry_failed:
+        # Articles modified since they were scraped, or left unscraped by a
+        # previous incremental run, are scraped whatever the cache says.
+        rescrapes = set()
+        if lastmod_store is not None:
+            rescrapes = lastmod_store.find_rescrapes(article_urls)
+        cached_urls = [url for url in article_urls if url not in rescrapes]
+        if args.save_to_firestore:
+            # Resolve remote existence once, in batches, and remember it.
+            candidates = index.filter_unscraped(cached_urls)
+            existing = find_existing_hashes(
+                db,
+                [hash_url(url) for url in candidates],
+                keyed_by_hash=args.upsert,
             )
+            index.record_many([(h, FIRESTORE_STATUS) for h in existing])
+            cached_urls = index.filter_unscraped(cached_urls)
+        else:
+            cached_urls = index.filter_unscraped(
+                cached_urls, statuses=LOCAL_STATUSES
+            )
+        kept = rescrapes.union(cached_urls)
+        article_urls = [url for url in article_urls if url in kept]
+    if lastmod_store is not None:
+        # The articles skipped were already scraped.
+        remaining = set(article_urls)
+        lastmod_store.mark_scraped(
+            [url for url in found_urls if url not in remaining]
+        )
+
+    if args.role == "coordinator":
+        added = work_queue.publish(article_urls)
+        work_queue.logger.info(
+            "Published %s new article URLs, %s were already queued.",
+            added,
+            len(article_urls) - added,
+        )
+        if lastmod_store is not None:
+            # The work queue retries the articles from now on.
+            lastmod_store.mark_scraped(article_urls)
+            lastmod_store.close()
+        work_queue.close()
+        index.close()
+        if journal is not None:
+            journal.close()
+        raise SystemExit
+
+    workers = os.cpu_count() if args.use_multiprocessing else args.workers
+    driver_options = dict(
+        disable_headless=args.disable_headless,
+        page_load_strategy=args.page_load_strategy,
+        block_resources=args.block_resources,
+        capture_backend=args.capture_backend,
+    )
+    if args.tabs_per_browser > 1:
+        # Tabs share the WebDriver session, so navigation must not block it
+        # until the page has loaded.
+        driver_options["page_load_strategy"] = "none"
+        driver_pool = TabPool(
+            partial(create_driver, **driver_options),
+            size=args.browser_pool_size
+            or math.ceil(workers / args.tabs_per_browser),
+            tabs_per_browser=args.tabs_per_browser,
+            max_pages=args.max_pages_per_browser,
+        )
+        setup_logger(driver_pool.logger)
     else:
-        for url in article_urls:
-            scraping_wrapper(url, args)
+        driver_pool = DriverPool(
+            size=args.browser_pool_size or workers,
+            max_pages=args.max_pages_per_browser,
+            **driver_options,
+        )
+    mood_client = MoodClient() if args.direct_moods else None
+    async_runner = None
+    if args.http_fast_path or args.direct_moods:
+        async_runner = AsyncRunner()
+    scheduler = Scheduler(
+        partial(
+            scraping_wrapper,
+            args=args,
+            driver_pool=driver_pool,
+            mood_client=mood_client,
+            article_index=index,
+            journal=journal,
+            async_runner=async_runner,
+        ),
+        workers=workers,
+        chunk_size=args.chunk_size,
+        task_timeout=args.task_timeout,
+        on_timeout=lambda url, thread: driver_pool.discard_borrowed(thread),
+    )
+    setup_logger(scheduler.logger)
+    progress = ProgressReporter(
+        len(article_urls) if work_queue is None else None,
+        skipped=total_urls - len(article_urls),
+        interval=args.progress_interval,
+    )
+    setup_logger(progress.logger)
+
+    def lease_batches():
+        """Yield the URL batches to scrape, leasing them in worker mode."""
+        if work_queue is None:
+            yield article_urls
+            return
+        while True:
+            batch = work_queue.lease(workers * args.chunk_size)
+            if batch:
+                yield batch
+                continue
+            if writer is not None:
+                # Complete the leases of the articles still queued for
+                # Firestore, or this worker would wait for itself.
+                writer.flush()
+            if not work_queue.has_unfinished():
+                return
+            # Wait for the leases of other workers to end or expire.
+            time.sleep(POLL_INTERVAL_SECONDS)
+
+    try:
+        for batch in lease_batches():
+            if journal is not None:
+                journal.record_many(batch, QUEUED)
+            for url, article_data in scheduler.run(batch):
+                if article_data is None:
+                    reason = "error or timeout"
+                elif not article_data.is_complete():
+                    reason = "missing " + ", ".join(
+                        article_data.missing_fields()
+                    )
+                else:
+                    reason = None
+
+                if reason is not None:
+                    progress.update("failed")
+                    mark_failed(url, reason)
+                    if writer is not None:
+                        scheduler.logger.warning(
+                            "Incomplete data not saved to Firestore: %s.", url
+                        )
+                    continue
+
+                progress.update("done")
+                if writer is not None:
+                    unwritten_urls[article_data.url_hash] = url
+                    writer.add(article_data.to_dict())
+                else:
+                    mark_done([url])
+    finally:
+        progress.report()
+        driver_pool.close()
+        if async_runner is not None:
+            async_runner.close()
+        if writer is not None:
+            writer.close()
+        index.close()
+        if journal is not None:
+            journal.close()
+        if lastmod_store is not None:
+            lastmod_store.close()
+        if work_queue is not None:
+            work_queue.close()
+        if BaseScraper.ADAPTIVE_TIMEOUTS is not None:
+            BaseScraper.ADAPTIVE_TIMEOUTS.save()
+        driver_pool.logger.info(
+            "Retry stats: navigation %s, HTTP %s",
+            dict(BaseScraper.RETRY_POLICY.stats),
+            dict(article_url_scraper.RETRY_POLICY.stats),
+        )
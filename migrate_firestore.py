@@ -0,0 +1,52 @@
+"""
+This module rekeys the Firestore articles collection by URL hash, removing
+the duplicate documents created by earlier runs with auto-generated IDs.
+"""
+
+import argparse
+import logging
+
+from firestore_store import (
+    COLLECTION_NAME,
+    init_firestore,
+    migrate_to_url_hash_ids,
+)
+
+
+def parse_arguments():
+    """Parse command line arguments."""
+    parser = argparse.ArgumentParser(
+        description="Rekey Firestore articles by URL hash.",
+    )
+    parser.add_argument(
+        "-fc",
+        "--firebase-credential-path",
+        metavar="PATH",
+        help="Path to the Firebase credential file",
+        default="firebase-adminsdk.json",
+    )
+    parser.add_argument(
+        "-c",
+        "--collection",
+        metavar="NAME",
+        help="Name of the articles collection",
+        default=COLLECTION_NAME,
+    )
+    parser.add_argument(
+        "-n",
+        "--dry-run",
+        action="store_true",
+        help="Only report what would be moved and deleted",
+    )
+    return parser.parse_args()
+
+
+if __name__ == "__main__":
+    logging.basicConfig(
+        level=logging.INFO,
+        format="%(asctime)s:%(levelname)s:%(message)s",
+    )
+    args = parse_arguments()
+    db = init_firestore(args.firebase_credential_path)
+    stats = migrate_to_url_hash_ids(db, args.collection, args.dry_run)
+    logging.info("Migration stats: %s", dict(stats))
@@ -0,0 +1,178 @@
+"""
+This module fetches article mood counts directly from Rappler's vote API,
+reusing the URL and headers of a vote request captured from a browser.
+"""
+
+import asyncio
+import logging
+import re
+from contextlib import nullcontext
+
+from aiohttp import ClientSession
+
+VOTE_API_ENDPOINT = "/api/v1/votes"
+BATCH_DELAY_SECONDS = 0.05
+POST_ID_PATTERNS = [
+    re.compile(r"<link[^>]+rel=['\"]shortlink['\"][^>]+\?p=(\d+)"),
+    re.compile(r"\bpostid-(\d+)\b"),
+]
+EXCLUDED_HEADERS = {
+    "accept-encoding",
+    "connection",
+    "content-length",
+    "host",
+    "transfer-encoding",
+}
+
+
+def extract_post_id(page: str) -> str | None:
+    """Extract the WordPress post ID from the article HTML."""
+    for pattern in POST_ID_PATTERNS:
+        match = pattern.search(page)
+        if match:
+            return match.group(1)
+    return None
+
+
+class MoodClient:
+    """Client calling the vote API directly instead of through a browser.
+
+    Posts requested through `fetch_batched` within `batch_delay` of each
+    other are fetched together with a single `fetch_many` call.
+    """
+
+    def __init__(
+        self,
+        concurrency: int = 8,
+        batch_delay: float = BATCH_DELAY_SECONDS,
+    ) -> None:
+        self.concurrency = concurrency
+        self.batch_delay = batch_delay
+        self.url_template: str | None = None
+        self.headers: dict[str, str] = {}
+        self._batch: dict[str, asyncio.Future] = {}
+        self._batch_task: asyncio.Task | None = None
+
+    @property
+    def is_ready(self) -> bool:
+        """Check if the client has captured a vote request to replay."""
+        return self.url_template is not None
+
+    def bootstrap(
+        self,
+        method: str,
+        url: str,
+        headers: dict[str, str],
+        post_id: str,
+    ) -> bool:
+        """Capture the vote API request made by the browser for a post.
+
+        Only read-only requests are captured, so replaying them never casts
+        a vote. Returns whether the request could be used as a template.
+        """
+        if method != "GET" or VOTE_API_ENDPOINT not in url:
+            return False
+        post_id_pattern = re.compile(rf"(?<!\d){post_id}(?!\d)")
+        if not post_id_pattern.search(url):
+            logging.warning("Post ID %s not found in %s.", post_id, url)
+            return False
+
+        escaped_url = url.replace("{", "{{").replace("}", "}}")
+        self.url_template = post_id_pattern.sub("{post_id}", escaped_url)
+        self.headers = {
+            key: value
+            for key, value in headers.items()
+            if key.lower() not in EXCLUDED_HEADERS
+        }
+        logging.info("Mood client bootstrapped from %s.", url)
+        return True
+
+    def reset(self) -> None:
+        """Forget the captured request so that it is bootstrapped again."""
+        self.url_template = None
+        self.headers = {}
+
+    async def fetch_moods(
+        self,
+        post_id: str,
+        session: ClientSession,
+    ) -> dict[str, int] | None:
+        """Fetch the mood counts of the given post.
+
+        Returns `None` if the client is not ready, e.g. because another
+        request was rejected meanwhile, so that the browser is used instead.
+        """
+        if not self.is_ready:
+            return None
+        url = self.url_template.format(post_id=post_id)
+        headers = self.headers
+        try:
+            async with session.get(url, headers=headers) as response:
+                if response.status in (401, 403):
+                    logging.warning("Vote API rejected the captured session.")
+                    self.reset()
+                    return None
+                response.raise_for_status()
+                raw_data = await response.json(content_type=None)
+        except Exception as err:
+            logging.error("Failed to fetch moods from %s: %s", url, err)
+            return None
+
+        try:
+            raw_data = raw_data["data"]["mood_count"]
+        except (KeyError, TypeError):
+            logging.error("Unexpected vote API response from %s.", url)
+            return None
+        return {k.lower(): v for k, v in raw_data.items()}
+
+    async def fetch_many(
+        self,
+        post_ids: list[str],
+        session: ClientSession | None = None,
+    ) -> dict[str, dict[str, int] | None]:
+        """Fetch the mood counts of several posts concurrently.
+
+        A session is opened for the call unless one is given.
+        """
+        semaphore = asyncio.Semaphore(self.concurrency)
+
+        async def fetch(post_id, session):
+            async with semaphore:
+                return await self.fetch_moods(post_id, session)
+
+        async with (
+            nullcontext(session) if session else ClientSession()
+        ) as session:
+            results = await asyncio.gather(
+                *[fetch(post_id, session) for post_id in post_ids]
+            )
+        return dict(zip(post_ids, results))
+
+    async def fetch_batched(
+        self,
+        post_id: str,
+        session: ClientSession,
+    ) -> dict[str, int] | None:
+        """Fetch the mood counts of a post along with concurrent requests."""
+        loop = asyncio.get_running_loop()
+        if not self._batch:
+            self._batch_task = loop.create_task(self._fetch_batch(session))
+        if post_id not in self._batch:
+            self._batch[post_id] = loop.create_future()
+        return await asyncio.shield(self._batch[post_id])
+
+    async def _fetch_batch(self, session: ClientSession) -> None:
+        """Fetch the posts requested during the batch delay.
+
+        A post whose moods cannot be fetched gets `None`, so that its
+        scraper falls back to the browser.
+        """
+        await asyncio.sleep(self.batch_delay)
+        batch, self._batch = self._batch, {}
+        try:
+            results = await self.fetch_many(list(batch), session)
+        except Exception as err:
+            logging.error("Failed to fetch a batch of moods: %s", err)
+            results = {}
+        for post_id, future in batch.items():
+            future.set_result(results.get(post_id))
@@ -0,0 +1,61 @@
+"""
+This module contains the retry policy shared by the sitemap and article
+scrapers to recover from transient network failures.
+"""
+
+import email.utils
+import random
+import time
+from collections import Counter
+from collections.abc import Callable
+
+TRANSIENT_STATUS_CODES = {408, 425, 429, 500, 502, 503, 504}
+
+
+def parse_retry_after(value: str | None) -> float | None:
+    """Parse a `Retry-After` header given in seconds or as an HTTP date."""
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = email.utils.parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, retry_at.timestamp() - time.time())
+
+
+class RetryPolicy:
+    """Retry transient failures with exponential backoff and full jitter."""
+
+    def __init__(
+        self,
+        is_retryable: Callable[[Exception], bool],
+        max_attempts: int = 4,
+        base_delay: float = 1.0,
+        max_delay: float = 60.0,
+    ) -> None:
+        self.is_retryable = is_retryable
+        self.max_attempts = max_attempts
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.stats: Counter[str] = Counter()
+
+    def should_retry(self, attempt: int, err: Exception) -> bool:
+        """Check if the failed attempt should be retried."""
+        if attempt < self.max_attempts and self.is_retryable(err):
+            self.stats["retries"] += 1
+            return True
+        self.stats["failures"] += 1
+        return False
+
+    def get_delay(
+        self, attempt: int, retry_after: float | None = None
+    ) -> float:
+        """Get the delay before the next attempt."""
+        if retry_after is not None:
+            return min(self.max_delay, retry_after)
+        backoff = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return random.uniform(0, backoff)
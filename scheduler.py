@@ -0,0 +1,227 @@
+"""
+This module contains the thread-based scheduler that dispatches article URLs
+to a configurable number of workers sharing a single work queue.
+"""
+
+import datetime
+import logging
+import queue
+import threading
+import time
+from collections import Counter
+from collections.abc import Callable, Iterable, Iterator
+from typing import Any
+
+_STOP = object()
+WATCHDOG_INTERVAL_SECONDS = 1.0
+
+
+class _Worker:
+    """State of a worker thread."""
+
+    def __init__(self) -> None:
+        self.thread: threading.Thread | None = None
+        self.abandoned = False
+
+
+class _Run:
+    """State of a single `Scheduler.run` call."""
+
+    def __init__(self) -> None:
+        self.tasks = queue.Queue()
+        self.results = queue.Queue()
+        self.stopped = threading.Event()
+        self.workers: list[_Worker] = []
+        # Item, start time and rest of the chunk of each busy worker.
+        self.in_flight: dict[_Worker, tuple[Any, float, list[Any]]] = {}
+
+
+class Scheduler:
+    """Run a task over items with a fixed number of worker threads.
+
+    Scraping is I/O-bound, so the worker count is independent of the number
+    of cores and all workers share the browsers and clients of the process.
+    Items are queued in chunks, and a task running longer than
+    `task_timeout` is reported as failed while its worker is abandoned and
+    replaced, after `on_timeout` had a chance to unblock it.
+    """
+
+    def __init__(
+        self,
+        task: Callable[[Any], Any],
+        workers: int = 1,
+        chunk_size: int = 1,
+        task_timeout: float | None = None,
+        on_timeout: Callable[[Any, threading.Thread], None] | None = None,
+    ) -> None:
+        self.task = task
+        self.workers = workers
+        self.chunk_size = chunk_size
+        self.task_timeout = task_timeout
+        self.on_timeout = on_timeout
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._lock = threading.Lock()
+
+    def _start_worker(self, run: _Run) -> None:
+        """Start a new worker thread unless the run is stopped."""
+        with self._lock:
+            if run.stopped.is_set():
+                return
+            worker = _Worker()
+            worker.thread = threading.Thread(
+                target=self._work,
+                args=(worker, run),
+                name=f"worker-{len(run.workers)}",
+                daemon=True,
+            )
+            run.workers.append(worker)
+            worker.thread.start()
+
+    def _work(self, worker: _Worker, run: _Run) -> None:
+        """Run chunks from the queue until told to stop or abandoned."""
+        while True:
+            chunk = run.tasks.get()
+            if chunk is _STOP:
+                return
+            for i, item in enumerate(chunk):
+                with self._lock:
+                    if worker.abandoned or run.stopped.is_set():
+                        return
+                    run.in_flight[worker] = (
+                        item,
+                        time.monotonic(),
+                        chunk[i + 1 :],
+                    )
+                try:
+                    result = self.task(item)
+                except Exception as err:
+                    self.logger.error("Task failed for %s: %s", item, err)
+                    result = None
+                with self._lock:
+                    timed_out = run.in_flight.pop(worker, None) is None
+                if not timed_out:
+                    run.results.put((item, result))
+
+    def _watch(self, run: _Run) -> None:
+        """Fail tasks running past the timeout and replace their workers."""
+        while not run.stopped.wait(WATCHDOG_INTERVAL_SECONDS):
+            now = time.monotonic()
+            with self._lock:
+                expired = [
+                    (worker, item, rest)
+                    for worker, (item, started, rest) in run.in_flight.items()
+                    if now - started > self.task_timeout
+                ]
+                for worker, _, _ in expired:
+                    del run.in_flight[worker]
+                    worker.abandoned = True
+
+            for worker, item, rest in expired:
+                self.logger.warning(
+                    "Task for %s timed out after %ss. Replacing %s...",
+                    item,
+                    self.task_timeout,
+                    worker.thread.name,
+                )
+                run.results.put((item, None))
+                if rest:
+                    # The stuck worker may never get to the rest of its chunk.
+                    run.tasks.put(rest)
+                if self.on_timeout is not None:
+                    self.on_timeout(item, worker.thread)
+                self._start_worker(run)
+
+    def run(self, items: Iterable[Any]) -> Iterator[tuple[Any, Any]]:
+        """Yield each item with its result in order of completion.
+
+        The result of a failed or timed out task is `None`. If the consumer
+        stops early, the items not started yet are dropped and only the
+        running tasks are waited for.
+        """
+        items = list(items)
+        run = _Run()
+        for start in range(0, len(items), self.chunk_size):
+            run.tasks.put(items[start : start + self.chunk_size])
+
+        for _ in range(self.workers):
+            self._start_worker(run)
+        if self.task_timeout is not None:
+            threading.Thread(
+                target=self._watch,
+                args=(run,),
+                name="watchdog",
+                daemon=True,
+            ).start()
+
+        try:
+            for _ in range(len(items)):
+                yield run.results.get()
+        finally:
+            with self._lock:
+                run.stopped.set()
+                workers = list(run.workers)
+            while True:
+                try:
+                    run.tasks.get_nowait()
+                except queue.Empty:
+                    break
+            for _ in workers:
+                run.tasks.put(_STOP)
+            for worker in workers:
+                if not worker.abandoned:
+                    worker.thread.join()
+
+
+class ProgressReporter:
+    """Log the progress, throughput and ETA of a run at regular intervals.
+
+    The total is `None` when URLs are leased from a work queue, in which
+    case the ETA is unknown.
+    """
+
+    def __init__(
+        self,
+        total: int | None,
+        skipped: int = 0,
+        interval: float = 10.0,
+    ) -> None:
+        self.total = total
+        self.interval = interval
+        self.counts: Counter[str] = Counter(skipped=skipped)
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._started_at = time.monotonic()
+        self._reported_at = self._started_at
+
+    def update(self, status: str) -> None:
+        """Count a finished task and report if the interval has passed."""
+        self.counts[status] += 1
+        now = time.monotonic()
+        if now - self._reported_at >= self.interval:
+            self.report()
+
+    def report(self) -> None:
+        """Log the current progress."""
+        now = time.monotonic()
+        self._reported_at = now
+        processed = self.counts["done"] + self.counts["failed"]
+        elapsed = now - self._started_at
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        if rate > 0 and self.total is not None:
+            eta = datetime.timedelta(
+                seconds=round((self.total - processed) / rate)
+            )
+        else:
+            eta = "unknown"
+        self.logger.info(
+            "Progress: %s/%s (done %s, failed %s, skipped %s), "
+            "%.2f articles/s, ETA %s",
+            processed,
+            "?" if self.total is None else self.total,
+            self.counts["done"],
+            self.counts["failed"],
+            self.counts["skipped"],
+            rate,
+            eta,
+        )
@@ -0,0 +1,370 @@
+"""
+This module lets several articles share one browser, each in its own tab,
+so that the pages load concurrently while a single Chrome process pays for
+the memory.
+
+WebDriver only talks to one tab at a time, so every command of a tab is
+sent under the lock of its browser after switching to the tab if needed.
+Pages keep loading in the background while other tabs are being driven.
+"""
+
+import inspect
+import logging
+import re
+import threading
+import time
+import types
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from typing import Any
+from urllib.parse import urldefrag
+
+from selenium.common.exceptions import TimeoutException, WebDriverException
+from selenium.webdriver.remote.webdriver import WebDriver
+from selenium.webdriver.remote.webelement import WebElement
+
+POLL_INTERVAL_SECONDS = 0.2
+CLOSE_TAB_LOCK_TIMEOUT_SECONDS = 10.0
+
+
+def normalize_url(url: str | None) -> str | None:
+    """Normalize a URL for comparison, ignoring fragment and trailing slash."""
+    if not url:
+        return None
+    return urldefrag(url).url.rstrip("/")
+
+
+class _Browser:
+    """State of a browser shared by several tabs."""
+
+    def __init__(self, driver: WebDriver) -> None:
+        self.driver = driver
+        self.lock = threading.RLock()
+        self.active_handle = driver.current_window_handle
+        self.free_handles = [self.active_handle]
+        self.borrowed = 0
+        self.pages = 0
+        self.draining = False
+
+
+class TabDriver:
+    """WebDriver restricted to one tab of a shared browser.
+
+    Methods of the underlying driver are rebound to this object, so that
+    every command goes through `execute`, and the elements it returns send
+    their own commands through it too. Captured requests are filtered to
+    the ones made by the page of this tab, using their document URL or
+    `Referer` header. Once the tab is closed by the pool, every command
+    fails.
+    """
+
+    def __init__(self, browser: _Browser, handle: str) -> None:
+        self.browser = browser
+        self.handle = handle
+        self.url: str | None = None
+        self.closed = False
+
+    def _check_open(self) -> None:
+        """Fail if the pool closed the tab, e.g. after a timeout."""
+        if self.closed:
+            raise WebDriverException("The tab was closed by the pool.")
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(type(self.browser.driver), name, None)
+        if isinstance(attr, property):
+            return attr.fget(self)
+        if inspect.isfunction(attr):
+            return types.MethodType(attr, self)
+        return getattr(self.browser.driver, name)
+
+    def _activate(self) -> None:
+        """Switch the browser to this tab unless it is already active."""
+        if self.browser.active_handle != self.handle:
+            self.browser.driver.switch_to.window(self.handle)
+            self.browser.active_handle = self.handle
+
+    def _adopt(self, value: Any) -> Any:
+        """Make the returned elements send their commands through the tab."""
+        if isinstance(value, WebElement):
+            value._parent = self
+        elif isinstance(value, list):
+            for item in value:
+                self._adopt(item)
+        elif isinstance(value, dict):
+            for item in value.values():
+                self._adopt(item)
+        return value
+
+    def execute(self, driver_command: str, params: dict | None = None) -> dict:
+        """Execute a command in this tab."""
+        with self.browser.lock:
+            self._check_open()
+            self._activate()
+            response = self.browser.driver.execute(driver_command, params)
+        self._adopt(response.get("value"))
+        return response
+
+    def get(self, url: str) -> None:
+        """Navigate this tab to the URL."""
+        self.url = url
+        self.execute("get", {"url": url})
+
+    def _is_own_request(self, request: Any) -> bool:
+        """Check if the captured request was made by the page of this tab."""
+        document_url = getattr(request, "document_url", None)
+        if document_url is None:
+            document_url = request.headers.get("Referer")
+        return normalize_url(document_url) == normalize_url(self.url)
+
+    @property
+    def requests(self) -> list[Any]:
+        """Get the captured requests made by the page of this tab."""
+        with self.browser.lock:
+            self._check_open()
+            requests = self.browser.driver.requests
+        return [
+            request for request in requests if self._is_own_request(request)
+        ]
+
+    def wait_for_request(self, pattern: str, timeout: float = 10) -> Any:
+        """Wait for a request of this tab matching the pattern."""
+        deadline = time.monotonic() + timeout
+        while True:
+            for request in self.requests:
+                if request.response and re.search(pattern, request.url):
+                    return request
+            if time.monotonic() >= deadline:
+                raise TimeoutException(
+                    f"Timed out after {timeout}s waiting for request "
+                    f"matching {pattern}"
+                )
+            time.sleep(POLL_INTERVAL_SECONDS)
+
+
+class TabPool:
+    """Pool of browsers each driving up to `tabs_per_browser` articles.
+
+    It has the same interface as `DriverPool` but hands out tabs. A browser
+    is recycled once it has loaded `max_pages` articles and its last tab is
+    returned, and a crashed browser is discarded with all its tabs. A tab
+    stuck past the task timeout is closed on its own.
+    """
+
+    def __init__(
+        self,
+        launch: Callable[[], WebDriver],
+        size: int = 1,
+        tabs_per_browser: int = 4,
+        max_pages: int = 100,
+    ) -> None:
+        self.launch = launch
+        self.size = size
+        self.tabs_per_browser = tabs_per_browser
+        self.max_pages = max_pages
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._lock = threading.Lock()
+        self._available = threading.Condition(self._lock)
+        self._browsers: list[_Browser] = []
+        self._launching = 0
+        self._borrowers: dict[int, TabDriver] = {}
+
+    def _is_healthy(self, browser: _Browser) -> bool:
+        """Check that the browser still responds to commands."""
+        try:
+            with browser.lock:
+                browser.driver.execute_script("return 1;")
+            return True
+        except WebDriverException:
+            return False
+
+    def _find_browser(self) -> _Browser | None:
+        """Find a browser with a free tab, preferring the least busy one."""
+        candidates = [
+            browser
+            for browser in self._browsers
+            if not browser.draining
+            and browser.borrowed < self.tabs_per_browser
+        ]
+        return min(candidates, key=lambda b: b.borrowed, default=None)
+
+    def _checkout(self) -> TabDriver:
+        """Borrow a tab, launching a browser if all are busy."""
+        with self._available:
+            while True:
+                browser = self._find_browser()
+                if browser is not None:
+                    browser.borrowed += 1
+                    break
+                if len(self._browsers) + self._launching < self.size:
+                    self._launching += 1
+                    browser = None
+                    break
+                self._available.wait()
+
+        if browser is None:
+            self.logger.info("Launching a new browser...")
+            try:
+                browser = _Browser(self.launch())
+            except BaseException:
+                with self._available:
+                    self._launching -= 1
+                    self._available.notify_all()
+                raise
+            # Counted as launching until tracked, so no extra one starts.
+            with self._available:
+                self._launching -= 1
+                browser.borrowed += 1
+                self._browsers.append(browser)
+                self._available.notify_all()
+
+        with browser.lock:
+            if browser.free_handles:
+                handle = browser.free_handles.pop()
+            else:
+                handle = self._open_tab(browser)
+        return TabDriver(browser, handle)
+
+    def _open_tab(self, browser: _Browser) -> str:
+        """Open a new tab and make it active, holding the browser lock."""
+        browser.driver.switch_to.new_window("tab")
+        handle = browser.driver.current_window_handle
+        browser.active_handle = handle
+        setup_tab = getattr(browser.driver, "setup_current_tab", None)
+        if setup_tab is not None:
+            setup_tab()
+        return handle
+
+    def _checkin(self, tab: TabDriver) -> None:
+        """Return the tab, recycling its browser when worn out."""
+        if tab.closed:
+            return  # Already replaced by a new tab when it was closed.
+        browser = tab.browser
+        try:
+            # Stop the previous article, e.g. its polling scripts.
+            tab.get("about:blank")
+        except WebDriverException:
+            pass
+
+        with self._available:
+            browser.borrowed -= 1
+            browser.pages += 1
+            if browser.pages >= self.max_pages:
+                browser.draining = True
+            if browser not in self._browsers:
+                return  # Already discarded while the tab was borrowed.
+            browser.free_handles.append(tab.handle)
+            is_idle = browser.borrowed == 0
+            worn_out = browser.draining and is_idle
+            self._available.notify_all()
+
+        if worn_out:
+            self.logger.info(
+                "Recycling browser after %s pages.", browser.pages
+            )
+            self._discard_browser(browser)
+        elif is_idle:
+            try:
+                with browser.lock:
+                    del browser.driver.requests
+            except WebDriverException:
+                pass
+
+    def _discard_browser(self, browser: _Browser) -> None:
+        """Quit the browser and stop tracking it."""
+        with self._available:
+            if browser in self._browsers:
+                self._browsers.remove(browser)
+            self._available.notify_all()
+        try:
+            browser.driver.quit()
+        except WebDriverException as we:
+            self.logger.warning("Failed to quit browser cleanly: %s", we)
+
+    def discard(self, tab: TabDriver) -> None:
+        """Quit the browser of the tab, including its other tabs."""
+        self._discard_browser(tab.browser)
+
+    @contextmanager
+    def borrow(self) -> Iterator[TabDriver]:
+        """Borrow a tab for the duration of the `with` block.
+
+        If the block raises and the browser no longer responds, it is
+        treated as crashed and discarded with all its tabs.
+        """
+        tab = self._checkout()
+        with self._lock:
+            self._borrowers[threading.get_ident()] = tab
+        try:
+            yield tab
+        except Exception:
+            if not self._is_healthy(tab.browser):
+                self.logger.warning("Discarding crashed browser.")
+                self._discard_browser(tab.browser)
+            raise
+        finally:
+            with self._lock:
+                self._borrowers.pop(threading.get_ident(), None)
+            self._checkin(tab)
+
+    def _close_tab(self, tab: TabDriver) -> bool:
+        """Close the tab, replacing it with a new one in its browser.
+
+        Returns whether it worked: the browser lock is only waited for
+        `CLOSE_TAB_LOCK_TIMEOUT_SECONDS`, as a stuck command may hold it.
+        """
+        browser = tab.browser
+        if not browser.lock.acquire(timeout=CLOSE_TAB_LOCK_TIMEOUT_SECONDS):
+            return False
+        try:
+            tab.closed = True
+            # Closing the last tab would end the session, so the new tab
+            # is opened first.
+            handle = self._open_tab(browser)
+            browser.driver.switch_to.window(tab.handle)
+            browser.driver.close()
+            browser.driver.switch_to.window(handle)
+            browser.active_handle = handle
+            browser.free_handles.append(handle)
+        except WebDriverException as we:
+            self.logger.warning("Failed to close tab: %s", we)
+            return False
+        finally:
+            browser.lock.release()
+
+        with self._available:
+            browser.borrowed -= 1
+            worn_out = (
+                browser.draining
+                and browser.borrowed == 0
+                and browser in self._browsers
+            )
+            self._available.notify_all()
+        if worn_out:
+            self.logger.info(
+                "Recycling browser after %s pages.", browser.pages
+            )
+            self._discard_browser(browser)
+        return True
+
+    def discard_borrowed(self, thread: threading.Thread) -> None:
+        """Close the tab used by a stuck thread to unblock it.
+
+        The other tabs of its browser keep going, unless the tab cannot be
+        closed, in which case the whole browser is quit.
+        """
+        with self._lock:
+            tab = self._borrowers.get(thread.ident)
+        if tab is None:
+            return
+        self.logger.warning("Closing tab of %s.", thread.name)
+        if not self._close_tab(tab):
+            self.logger.warning("Killing browser of %s.", thread.name)
+            self._discard_browser(tab.browser)
+
+    def close(self) -> None:
+        """Quit every browser of the pool, including borrowed ones."""
+        with self._lock:
+            browsers = list(self._browsers)
+        for browser in browsers:
+            self._discard_browser(browser)
@@ -0,0 +1,93 @@
+"""
+Tests of the store of sitemap modification times used by incremental runs.
+"""
+
+import pytest
+
+import article_url_scraper
+from article_url_scraper import LastmodStore
+
+URLS = [f"https://www.rappler.com/article-{i}" for i in range(3)]
+
+
+class FakeTime:
+    """Clock advanced by hand instead of sleeping."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(article_url_scraper, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def path(tmp_path, clock):
+    return str(tmp_path / "lastmod.sqlite3")
+
+
+@pytest.fixture
+def store(path):
+    store = LastmodStore(path)
+    yield store
+    store.close()
+
+
+def test_url_is_modified_until_its_lastmod_is_seen(store):
+    assert store.is_modified(URLS[0], "2024-01-01")
+
+    store.update(URLS[0], "2024-01-01")
+
+    assert not store.is_modified(URLS[0], "2024-01-01")
+    assert not store.is_modified(URLS[0], None)
+    assert store.is_modified(URLS[0], "2024-02-01")
+
+
+def test_pending_url_is_seen_only_once_scraped(store, clock):
+    store.add_pending(URLS[1], "2024-01-01")
+    clock.now += 1
+    store.add_pending(URLS[0], "2024-01-01")
+
+    assert store.get_pending() == [URLS[1], URLS[0]]
+    assert store.is_modified(URLS[0], "2024-01-01")
+
+    store.mark_scraped([URLS[0]])
+
+    assert store.get_pending() == [URLS[1]]
+    assert not store.is_modified(URLS[0], "2024-01-01")
+
+
+def test_pending_urls_survive_a_failed_run(path, clock):
+    store = LastmodStore(path)
+    store.add_pending(URLS[0], "2024-01-01")
+    store.close()
+
+    clock.now += 60
+    store = LastmodStore(path)
+    try:
+        assert store.get_pending() == [URLS[0]]
+    finally:
+        store.close()
+
+
+def test_rescrapes_exclude_urls_first_found_in_this_run(path, clock):
+    store = LastmodStore(path)
+    store.add_pending(URLS[0], "2024-01-01")
+    store.mark_scraped([URLS[0]])
+    store.add_pending(URLS[1], "2024-01-01")
+    store.close()
+
+    clock.now += 60
+    store = LastmodStore(path)
+    try:
+        store.add_pending(URLS[2], "2024-01-01")
+
+        assert store.find_rescrapes(URLS) == {URLS[0], URLS[1]}
+    finally:
+        store.close()
@@ -0,0 +1,70 @@
+"""
+Tests of the checkpoint journal and how a run resumes from it.
+"""
+
+import pytest
+
+from checkpoint import DONE, FAILED, IN_FLIGHT, QUEUED, CheckpointJournal
+
+URLS = [f"https://www.rappler.com/article-{i}" for i in range(4)]
+
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "checkpoint.jsonl")
+
+
+def test_resume_keeps_urls_not_finished(path):
+    journal = CheckpointJournal(path)
+    journal.record_many(URLS, QUEUED)
+    journal.record(URLS[0], IN_FLIGHT)
+    journal.record(URLS[1], DONE)
+    journal.record(URLS[2], FAILED, "missing content")
+    journal.close()
+
+    journal = CheckpointJournal(path)
+    try:
+        assert journal.resume(URLS) == [URLS[0], URLS[3]]
+        assert journal.get_failed() == {URLS[2]: "missing content"}
+    finally:
+        journal.close()
+
+
+def test_last_state_of_a_url_wins(path):
+    journal = CheckpointJournal(path)
+    journal.record(URLS[0], FAILED, "timeout")
+    journal.record(URLS[0], DONE)
+    journal.close()
+
+    journal = CheckpointJournal(path)
+    try:
+        assert journal.states[URLS[0]] == (DONE, None)
+        assert journal.get_failed() == {}
+    finally:
+        journal.close()
+
+
+def test_reopening_compacts_the_journal(path):
+    journal = CheckpointJournal(path)
+    for state in (QUEUED, IN_FLIGHT, DONE):
+        journal.record(URLS[0], state)
+    journal.close()
+
+    CheckpointJournal(path).close()
+
+    with open(path, encoding="utf-8") as f:
+        assert len(f.readlines()) == 1
+
+
+def test_torn_last_line_is_ignored(path):
+    journal = CheckpointJournal(path)
+    journal.record(URLS[0], DONE)
+    journal.close()
+    with open(path, "a", encoding="utf-8") as f:
+        f.write('{"url": "https://www.rappler.com/torn", "sta')
+
+    journal = CheckpointJournal(path)
+    try:
+        assert journal.states == {URLS[0]: (DONE, None)}
+    finally:
+        journal.close()
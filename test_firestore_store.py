@@ -0,0 +1,130 @@
+"""
+Tests of the bulk Firestore writer against a fake database.
+"""
+
+import itertools
+import threading
+import time
+from types import SimpleNamespace
+
+from firestore_store import FirestoreWriter
+
+ARTICLES = [
+    {"url": f"https://www.rappler.com/article-{i}", "url_hash": f"hash-{i}"}
+    for i in range(5)
+]
+
+
+class FakeBulkWriter:
+    """Bulk writer calling back for every write when closed."""
+
+    def __init__(self, db: "FakeDB") -> None:
+        self.db = db
+        self.writes = []
+
+    def on_write_result(self, callback) -> None:
+        self.on_result = callback
+
+    def on_write_error(self, callback) -> None:
+        self.on_error = callback
+
+    def set(self, reference, data: dict) -> None:
+        self.writes.append((reference, data))
+
+    def close(self) -> None:
+        for reference, data in self.writes:
+            for attempts in itertools.count(1):
+                if data["url_hash"] not in self.db.failing:
+                    self.db.documents[reference.id] = data
+                    self.on_result(reference, None, None)
+                    break
+                failure = SimpleNamespace(
+                    attempts=attempts,
+                    operation=SimpleNamespace(reference=reference),
+                    message="unavailable",
+                )
+                if not self.on_error(failure, self):
+                    break
+
+
+class FakeCollection:
+    def __init__(self) -> None:
+        self.ids = itertools.count()
+
+    def document(self, document_id: str | None = None):
+        if document_id is None:
+            document_id = f"auto-{next(self.ids)}"
+        return SimpleNamespace(id=document_id)
+
+
+class FakeDB:
+    def __init__(self, failing: set[str] = frozenset()) -> None:
+        self.failing = failing
+        self.documents = {}
+        self.flushes = 0
+        self._collection = FakeCollection()
+
+    def bulk_writer(self) -> FakeBulkWriter:
+        self.flushes += 1
+        return FakeBulkWriter(self)
+
+    def collection(self, name: str) -> FakeCollection:
+        return self._collection
+
+
+def test_full_batch_is_flushed():
+    db = FakeDB()
+    written = []
+    writer = FirestoreWriter(db, flush_size=2, on_written=written.extend)
+    try:
+        for article in ARTICLES[:3]:
+            writer.add(article)
+
+        assert db.flushes == 1
+        assert written == ["hash-0", "hash-1"]
+    finally:
+        writer.close()
+
+    assert written == ["hash-0", "hash-1", "hash-2"]
+
+
+def test_upsert_stores_articles_under_their_url_hash():
+    db = FakeDB()
+    writer = FirestoreWriter(db, upsert=True)
+    for article in ARTICLES[:2]:
+        writer.add(article)
+    writer.close()
+
+    assert set(db.documents) == {"hash-0", "hash-1"}
+
+
+def test_stale_articles_are_flushed_in_the_background():
+    db = FakeDB()
+    flushed = threading.Event()
+    writer = FirestoreWriter(
+        db,
+        flush_interval=0.05,
+        on_written=lambda hashes: flushed.set(),
+    )
+    try:
+        started_at = time.monotonic()
+        writer.add(ARTICLES[0])
+
+        assert flushed.wait(5)
+        assert time.monotonic() - started_at >= 0.05
+    finally:
+        writer.close()
+
+    assert db.flushes == 1
+
+
+def test_failed_writes_are_retried_and_not_reported_as_written():
+    db = FakeDB(failing={"hash-1"})
+    written = []
+    writer = FirestoreWriter(db, max_attempts=3, on_written=written.extend)
+    for article in ARTICLES[:3]:
+        writer.add(article)
+    writer.close()
+
+    assert sorted(written) == ["hash-0", "hash-2"]
+    assert len(db.documents) == 2
@@ -0,0 +1,118 @@
+"""
+Tests of the vote API client against a local server.
+"""
+
+import asyncio
+
+from aiohttp import ClientSession, web
+
+from mood_client import MoodClient
+
+POST_IDS = [str(post_id) for post_id in range(4201, 4221)]
+
+
+async def serve(handler):
+    """Start a local vote API answering with the given handler."""
+    app = web.Application()
+    app.router.add_get("/api/v1/votes/{post_id}", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/api/v1/votes/4201"
+
+
+def bootstrapped_client(url, **kwargs):
+    client = MoodClient(**kwargs)
+    assert client.bootstrap("GET", url, {"Cookie": "session"}, "4201")
+    return client
+
+
+async def moods(request):
+    post_id = int(request.match_info["post_id"])
+    return web.json_response({"data": {"mood_count": {"Happy": post_id}}})
+
+
+def test_fetch_many_returns_the_moods_of_each_post():
+    async def main():
+        runner, url = await serve(moods)
+        try:
+            client = bootstrapped_client(url)
+            return await client.fetch_many(POST_IDS)
+        finally:
+            await runner.cleanup()
+
+    results = asyncio.run(main())
+
+    assert results == {p: {"happy": int(p)} for p in POST_IDS}
+
+
+def test_rejected_request_mid_batch_does_not_raise():
+    async def reject_one(request):
+        if request.match_info["post_id"] == "4203":
+            raise web.HTTPForbidden()
+        await asyncio.sleep(0.01)
+        return await moods(request)
+
+    async def main():
+        runner, url = await serve(reject_one)
+        try:
+            client = bootstrapped_client(url, concurrency=2)
+            results = await client.fetch_many(POST_IDS)
+            return client, results
+        finally:
+            await runner.cleanup()
+
+    client, results = asyncio.run(main())
+
+    assert not client.is_ready
+    assert results["4203"] is None
+    # Posts not requested before the rejection fall back to the browser.
+    assert results[POST_IDS[-1]] is None
+    assert results["4201"] == {"happy": 4201}
+
+
+def test_concurrent_fetches_are_batched():
+    async def main():
+        runner, url = await serve(moods)
+        try:
+            client = bootstrapped_client(url)
+            calls = []
+            fetch_many = client.fetch_many
+
+            async def counting_fetch_many(post_ids, session=None):
+                calls.append(post_ids)
+                return await fetch_many(post_ids, session)
+
+            client.fetch_many = counting_fetch_many
+            async with ClientSession() as session:
+                results = await asyncio.gather(
+                    *[client.fetch_batched(p, session) for p in POST_IDS]
+                )
+            return calls, results
+        finally:
+            await runner.cleanup()
+
+    calls, results = asyncio.run(main())
+
+    assert calls == [POST_IDS]
+    assert results == [{"happy": int(p)} for p in POST_IDS]
+
+
+def test_failed_batch_resolves_every_fetch_to_none():
+    async def main():
+        client = MoodClient()
+        client.bootstrap(
+            "GET", "http://127.0.0.1/api/v1/votes/4201", {}, "4201"
+        )
+
+        async def failing_fetch_many(post_ids, session=None):
+            raise RuntimeError("boom")
+
+        client.fetch_many = failing_fetch_many
+        return await asyncio.gather(
+            *[client.fetch_batched(p, None) for p in POST_IDS[:3]]
+        )
+
+    assert asyncio.run(main()) == [None, None, None]
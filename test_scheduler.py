@@ -0,0 +1,115 @@
+"""
+Tests of the thread scheduler, its task timeouts and early exit.
+"""
+
+import threading
+import time
+
+import pytest
+
+import scheduler
+from scheduler import Scheduler
+
+
+@pytest.fixture(autouse=True)
+def fast_watchdog(monkeypatch):
+    monkeypatch.setattr(scheduler, "WATCHDOG_INTERVAL_SECONDS", 0.01)
+
+
+@pytest.fixture
+def stuck():
+    """Event blocking stuck tasks until the end of the test."""
+    event = threading.Event()
+    yield event
+    event.set()
+
+
+def test_run_yields_every_item_with_its_result():
+    tasks = Scheduler(lambda x: x * 2, workers=3, chunk_size=2)
+
+    results = dict(tasks.run(range(10)))
+
+    assert results == {x: x * 2 for x in range(10)}
+
+
+def test_failed_task_yields_none():
+    def task(x):
+        if x == 1:
+            raise ValueError("boom")
+        return x
+
+    results = dict(Scheduler(task, workers=2).run(range(3)))
+
+    assert results == {0: 0, 1: None, 2: 2}
+
+
+def test_timed_out_task_yields_none_and_is_reported(stuck):
+    timed_out = []
+
+    def task(x):
+        if x == 0:
+            stuck.wait()
+        return x
+
+    tasks = Scheduler(
+        task,
+        workers=1,
+        task_timeout=0.05,
+        on_timeout=lambda item, thread: timed_out.append(item),
+    )
+    results = dict(tasks.run(range(3)))
+
+    assert results == {0: None, 1: 1, 2: 2}
+    assert timed_out == [0]
+
+
+def test_rest_of_timed_out_chunk_is_requeued(stuck):
+    ran = []
+
+    def task(x):
+        if x == 0:
+            stuck.wait()
+        ran.append(x)
+        return x
+
+    tasks = Scheduler(task, workers=1, chunk_size=4, task_timeout=0.05)
+    started_at = time.monotonic()
+    results = dict(tasks.run(range(4)))
+
+    assert results == {0: None, 1: 1, 2: 2, 3: 3}
+    assert sorted(ran) == [1, 2, 3]
+    assert time.monotonic() - started_at < 5
+
+
+def test_stopping_early_skips_the_items_not_started():
+    ran = []
+
+    def task(x):
+        time.sleep(0.01)
+        ran.append(x)
+        return x
+
+    tasks = Scheduler(task, workers=4, chunk_size=2)
+    with pytest.raises(RuntimeError):
+        for count, _ in enumerate(tasks.run(range(60)), start=1):
+            if count == 3:
+                raise RuntimeError("consumer failed")
+
+    # At most the chunks already handed to the workers are finished.
+    assert len(ran) < 60
+    assert len(ran) <= 3 + 4 * 2
+
+
+def test_runs_do_not_share_state(stuck):
+    def task(x):
+        if x == "stuck":
+            stuck.wait()
+        return x
+
+    tasks = Scheduler(task, workers=1, task_timeout=0.05)
+
+    first = dict(tasks.run(["stuck", "a"]))
+    second = dict(tasks.run(["b", "c"]))
+
+    assert first == {"stuck": None, "a": "a"}
+    assert second == {"b": "b", "c": "c"}
@@ -0,0 +1,168 @@
+"""
+Tests of the tab pool against fake browsers.
+"""
+
+import itertools
+import threading
+import time
+
+import pytest
+
+from tab_pool import TabPool
+
+
+class FakeSwitchTo:
+    def __init__(self, driver: "FakeDriver") -> None:
+        self.driver = driver
+
+    def new_window(self, kind: str) -> None:
+        handle = f"tab-{next(self.driver.handle_ids)}"
+        self.driver.handles.append(handle)
+        self.driver.current_window_handle = handle
+
+    def window(self, handle: str) -> None:
+        self.driver.current_window_handle = handle
+
+
+class FakeDriver:
+    """Browser answering every command without loading anything."""
+
+    def __init__(self) -> None:
+        self.handle_ids = itertools.count()
+        self.handles = [f"tab-{next(self.handle_ids)}"]
+        self.current_window_handle = self.handles[0]
+        self.switch_to = FakeSwitchTo(self)
+        self.quit_called = False
+
+    def execute(self, driver_command: str, params: dict | None = None):
+        return {"value": None}
+
+    def execute_script(self, script: str) -> None:
+        return None
+
+    @property
+    def requests(self) -> list:
+        return []
+
+    @requests.deleter
+    def requests(self) -> None:
+        pass
+
+    def close(self) -> None:
+        self.handles.remove(self.current_window_handle)
+
+    def quit(self) -> None:
+        self.quit_called = True
+
+
+class YieldingCondition:
+    """Condition yielding to other threads after each critical section."""
+
+    def __init__(self, condition: threading.Condition) -> None:
+        self.condition = condition
+
+    def __enter__(self):
+        return self.condition.__enter__()
+
+    def __exit__(self, *exc_info):
+        self.condition.__exit__(*exc_info)
+        time.sleep(0.05)
+
+    def __getattr__(self, name: str):
+        return getattr(self.condition, name)
+
+
+@pytest.fixture
+def launched():
+    return []
+
+
+@pytest.fixture
+def launch(launched):
+    def launch():
+        driver = FakeDriver()
+        launched.append(driver)
+        return driver
+
+    return launch
+
+
+def test_tabs_share_a_browser(launch, launched):
+    pool = TabPool(launch, size=1, tabs_per_browser=2)
+
+    with pool.borrow() as first, pool.borrow() as second:
+        assert first.browser is second.browser
+        assert first.handle != second.handle
+
+    assert len(launched) == 1
+
+
+def test_worn_out_browser_is_recycled(launch, launched):
+    pool = TabPool(launch, size=1, tabs_per_browser=1, max_pages=2)
+
+    for _ in range(3):
+        with pool.borrow():
+            pass
+
+    assert len(launched) == 2
+    assert launched[0].quit_called
+
+
+def test_closing_last_tab_of_draining_browser_recycles_it(launch, launched):
+    pool = TabPool(launch, size=1, tabs_per_browser=2)
+    stuck_tab = pool._checkout()
+    stuck_tab.browser.draining = True
+
+    assert pool._close_tab(stuck_tab)
+
+    assert launched[0].quit_called
+    with pool.borrow() as tab:
+        assert tab.browser.driver is launched[1]
+
+
+def test_closed_tab_is_replaced_in_its_browser(launch, launched):
+    pool = TabPool(launch, size=1, tabs_per_browser=2)
+    stuck_tab = pool._checkout()
+
+    assert pool._close_tab(stuck_tab)
+
+    assert stuck_tab.closed
+    assert stuck_tab.handle not in launched[0].handles
+    with pool.borrow() as tab:
+        assert tab.browser is stuck_tab.browser
+    assert not launched[0].quit_called
+
+
+def test_concurrent_checkouts_launch_at_most_size_browsers(launch, launched):
+    pool = TabPool(launch, size=1, tabs_per_browser=2)
+    pool._available = YieldingCondition(pool._available)
+
+    tabs = []
+    threads = [
+        threading.Thread(target=lambda: tabs.append(pool._checkout()))
+        for _ in range(2)
+    ]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join(timeout=5)
+
+    assert len(tabs) == 2
+    assert len(launched) == 1
+
+
+def test_failed_launch_lets_another_browser_launch(launched):
+    def launch():
+        if not launched:
+            launched.append(None)
+            raise RuntimeError("Chrome failed to start")
+        driver = FakeDriver()
+        launched.append(driver)
+        return driver
+
+    pool = TabPool(launch, size=1)
+
+    with pytest.raises(RuntimeError):
+        pool._checkout()
+    with pool.borrow() as tab:
+        assert tab.browser.driver is launched[1]
@@ -0,0 +1,124 @@
+"""
+Tests of the SQLite work queue, which stands in for Redis in tests.
+"""
+
+import pytest
+
+import work_queue
+from work_queue import SqliteWorkQueue, open_queue
+
+URLS = [f"https://www.rappler.com/article-{i}" for i in range(5)]
+
+
+class FakeTime:
+    """Clock advanced by hand instead of sleeping."""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def time(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    clock = FakeTime()
+    monkeypatch.setattr(work_queue, "time", clock)
+    return clock
+
+
+@pytest.fixture
+def queue(tmp_path, clock):
+    queue = SqliteWorkQueue(
+        str(tmp_path / "queue.sqlite3"),
+        visibility_timeout=60,
+        max_deliveries=2,
+    )
+    yield queue
+    queue.close()
+
+
+def test_publish_ignores_urls_already_published(queue):
+    assert queue.publish(URLS) == len(URLS)
+    assert queue.publish(URLS[:2] + ["https://www.rappler.com/new"]) == 1
+
+
+def test_lease_hands_out_each_url_once(queue):
+    queue.publish(URLS)
+
+    first = queue.lease(3)
+    second = queue.lease(3)
+
+    assert len(first) == 3
+    assert sorted(first + second) == sorted(URLS)
+    assert queue.lease(3) == []
+
+
+def test_leased_urls_are_unfinished_until_completed(queue):
+    queue.publish(URLS[:2])
+    leased = queue.lease(2)
+
+    assert queue.lease(2) == []
+    assert queue.has_unfinished()
+
+    for url in leased:
+        queue.complete(url)
+
+    assert not queue.has_unfinished()
+
+
+def test_expired_lease_is_handed_out_again(queue, clock):
+    queue.publish(URLS[:1])
+    assert queue.lease(1) == URLS[:1]
+
+    clock.now += 59
+    assert queue.lease(1) == []
+
+    clock.now += 2
+    assert queue.lease(1) == URLS[:1]
+
+
+def test_completed_url_is_not_handed_out_after_expiry(queue, clock):
+    queue.publish(URLS[:1])
+    queue.lease(1)
+    queue.complete(URLS[0])
+
+    clock.now += 120
+
+    assert queue.lease(1) == []
+    assert not queue.has_unfinished()
+
+
+def test_failed_url_is_not_handed_out_again(queue, clock):
+    queue.publish(URLS[:1])
+    queue.lease(1)
+    queue.fail(URLS[0], "missing content")
+
+    clock.now += 120
+
+    assert queue.lease(1) == []
+    assert not queue.has_unfinished()
+
+
+def test_url_fails_once_its_deliveries_are_exhausted(queue, clock):
+    queue.publish(URLS[:1])
+    for _ in range(2):
+        assert queue.lease(1) == URLS[:1]
+        clock.now += 61
+
+    assert queue.lease(1) == []
+    assert not queue.has_unfinished()
+
+
+def test_open_queue_opens_sqlite_urls(tmp_path):
+    queue = open_queue(f"sqlite:///{tmp_path / 'queue.sqlite3'}", 30)
+    try:
+        assert isinstance(queue, SqliteWorkQueue)
+        assert queue.visibility_timeout == 30
+    finally:
+        queue.close()
+
+
+def test_open_queue_rejects_unknown_schemes():
+    with pytest.raises(ValueError):
+        open_queue("amqp://localhost")
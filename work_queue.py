@@ -0,0 +1,265 @@
+"""
+This module contains the work queues that share article URLs between a
+coordinator and scraping workers, possibly running on different nodes.
+
+URLs are leased with a visibility timeout: a lease that is neither completed
+nor failed in time, e.g. because its worker died, makes the URL available
+again. A URL is published only once per queue, so it is never scraped twice
+unless its lease expired.
+"""
+
+import logging
+import sqlite3
+import threading
+import time
+from urllib.parse import urlparse
+
+try:
+    import redis
+except ImportError:  # Only needed for Redis queues.
+    redis = None
+
+QUEUE_NAME = "rappler_articles"
+VISIBILITY_TIMEOUT_SECONDS = 3600.0
+MAX_DELIVERIES = 3
+POLL_INTERVAL_SECONDS = 30.0
+PUBLISH_BATCH_SIZE = 1000
+
+
+class SqliteWorkQueue:
+    """Work queue stored in a local SQLite file.
+
+    Suitable for workers on a single node, or as a stand-in for Redis in
+    tests and small runs.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        visibility_timeout: float = VISIBILITY_TIMEOUT_SECONDS,
+        max_deliveries: int = MAX_DELIVERIES,
+    ) -> None:
+        self.visibility_timeout = visibility_timeout
+        self.max_deliveries = max_deliveries
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self._lock = threading.Lock()
+        self.connection = sqlite3.connect(
+            path, timeout=30, isolation_level=None, check_same_thread=False
+        )
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS jobs ("
+            "url TEXT PRIMARY KEY, "
+            "state TEXT NOT NULL DEFAULT 'pending', "
+            "lease_until REAL, "
+            "attempts INTEGER NOT NULL DEFAULT 0, "
+            "reason TEXT)"
+        )
+        self.connection.execute(
+            "CREATE INDEX IF NOT EXISTS jobs_state "
+            "ON jobs (state, lease_until)"
+        )
+
+    def publish(self, urls: list[str]) -> int:
+        """Add the URLs not published yet and return how many were added."""
+        with self._lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                before = self.connection.total_changes
+                self.connection.executemany(
+                    "INSERT OR IGNORE INTO jobs (url) VALUES (?)",
+                    [(url,) for url in urls],
+                )
+                added = self.connection.total_changes - before
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        return added
+
+    def lease(self, count: int) -> list[str]:
+        """Lease up to `count` available URLs."""
+        now = time.time()
+        with self._lock:
+            self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                self.connection.execute(
+                    "UPDATE jobs SET state = 'failed', "
+                    "reason = 'lease expired too many times' "
+                    "WHERE state = 'leased' AND lease_until < ? "
+                    "AND attempts >= ?",
+                    (now, self.max_deliveries),
+                )
+                rows = self.connection.execute(
+                    "SELECT url FROM jobs WHERE state = 'pending' "
+                    "OR (state = 'leased' AND lease_until < ?) LIMIT ?",
+                    (now, count),
+                ).fetchall()
+                urls = [url for (url,) in rows]
+                self.connection.executemany(
+                    "UPDATE jobs SET state = 'leased', lease_until = ?, "
+                    "attempts = attempts + 1 WHERE url = ?",
+                    [(now + self.visibility_timeout, url) for url in urls],
+                )
+                self.connection.execute("COMMIT")
+            except Exception:
+                self.connection.execute("ROLLBACK")
+                raise
+        return urls
+
+    def complete(self, url: str) -> None:
+        """Mark a leased URL as scraped."""
+        with self._lock:
+            self.connection.execute(
+                "UPDATE jobs SET state = 'done', lease_until = NULL "
+                "WHERE url = ?",
+                (url,),
+            )
+
+    def fail(self, url: str, reason: str) -> None:
+        """Mark a leased URL as failed so that it is not leased again."""
+        with self._lock:
+            self.connection.execute(
+                "UPDATE jobs SET state = 'failed', lease_until = NULL, "
+                "reason = ? WHERE url = ?",
+                (reason, url),
+            )
+
+    def has_unfinished(self) -> bool:
+        """Check if some URLs are still pending or leased."""
+        with self._lock:
+            row = self.connection.execute(
+                "SELECT 1 FROM jobs WHERE state IN ('pending', 'leased') "
+                "LIMIT 1"
+            ).fetchone()
+        return row is not None
+
+    def close(self) -> None:
+        """Close the queue."""
+        self.connection.close()
+
+
+class RedisWorkQueue:
+    """Work queue stored in Redis, shared by workers on several nodes.
+
+    Pending URLs are kept in a list and leased URLs in a sorted set scored
+    by lease expiry, which is checked against the Redis clock so that the
+    clocks of the nodes do not matter.
+    """
+
+    LEASE_SCRIPT = """
+    local now = redis.call('TIME')
+    now = tonumber(now[1]) + tonumber(now[2]) / 1000000
+    local expired = redis.call('ZRANGEBYSCORE', KEYS[2], '-inf', now)
+    for _, url in ipairs(expired) do
+        redis.call('ZREM', KEYS[2], url)
+        if tonumber(redis.call('HGET', KEYS[3], url) or '0')
+                >= tonumber(ARGV[3]) then
+            redis.call('HSET', KEYS[4], url, 'lease expired too many times')
+        else
+            redis.call('RPUSH', KEYS[1], url)
+        end
+    end
+    local urls = {}
+    for _ = 1, tonumber(ARGV[1]) do
+        local url = redis.call('LPOP', KEYS[1])
+        if not url then
+            break
+        end
+        redis.call('ZADD', KEYS[2], now + tonumber(ARGV[2]), url)
+        redis.call('HINCRBY', KEYS[3], url, 1)
+        table.insert(urls, url)
+    end
+    return urls
+    """
+
+    def __init__(
+        self,
+        url: str,
+        name: str = QUEUE_NAME,
+        visibility_timeout: float = VISIBILITY_TIMEOUT_SECONDS,
+        max_deliveries: int = MAX_DELIVERIES,
+    ) -> None:
+        if redis is None:
+            raise ImportError("Install redis to use a Redis work queue.")
+        self.visibility_timeout = visibility_timeout
+        self.max_deliveries = max_deliveries
+        self.logger = logging.getLogger(self.__class__.__name__)
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.published_key = f"{name}:published"
+        self.pending_key = f"{name}:pending"
+        self.leased_key = f"{name}:leased"
+        self.attempts_key = f"{name}:attempts"
+        self.failed_key = f"{name}:failed"
+        self._lease = self.client.register_script(self.LEASE_SCRIPT)
+
+    def publish(self, urls: list[str]) -> int:
+        """Add the URLs not published yet and return how many were added."""
+        added = 0
+        for start in range(0, len(urls), PUBLISH_BATCH_SIZE):
+            batch = urls[start : start + PUBLISH_BATCH_SIZE]
+            pipeline = self.client.pipeline()
+            for url in batch:
+                pipeline.sadd(self.published_key, url)
+            new_urls = [
+                url for url, is_new in zip(batch, pipeline.execute()) if is_new
+            ]
+            if new_urls:
+                self.client.rpush(self.pending_key, *new_urls)
+            added += len(new_urls)
+        return added
+
+    def lease(self, count: int) -> list[str]:
+        """Lease up to `count` available URLs."""
+        return self._lease(
+            keys=[
+                self.pending_key,
+                self.leased_key,
+                self.attempts_key,
+                self.failed_key,
+            ],
+            args=[count, self.visibility_timeout, self.max_deliveries],
+        )
+
+    def complete(self, url: str) -> None:
+        """Mark a leased URL as scraped."""
+        pipeline = self.client.pipeline()
+        pipeline.zrem(self.leased_key, url)
+        pipeline.hdel(self.attempts_key, url)
+        pipeline.execute()
+
+    def fail(self, url: str, reason: str) -> None:
+        """Mark a leased URL as failed so that it is not leased again."""
+        pipeline = self.client.pipeline()
+        pipeline.zrem(self.leased_key, url)
+        pipeline.hset(self.failed_key, url, reason)
+        pipeline.execute()
+
+    def has_unfinished(self) -> bool:
+        """Check if some URLs are still pending or leased."""
+        pipeline = self.client.pipeline()
+        pipeline.llen(self.pending_key)
+        pipeline.zcard(self.leased_key)
+        return any(pipeline.execute())
+
+    def close(self) -> None:
+        """Close the queue."""
+        self.client.close()
+
+
+def open_queue(
+    queue_url: str,
+    visibility_timeout: float = VISIBILITY_TIMEOUT_SECONDS,
+) -> SqliteWorkQueue | RedisWorkQueue:
+    """Open the work queue at a `redis://` or `sqlite:///` URL."""
+    parsed = urlparse(queue_url)
+    if parsed.scheme in ("redis", "rediss", "unix"):
+        return RedisWorkQueue(queue_url, visibility_timeout=visibility_timeout)
+    if parsed.scheme == "sqlite":
+        return SqliteWorkQueue(
+            parsed.path.removeprefix("/"),
+            visibility_timeout=visibility_timeout,
+        )
+    raise ValueError(f"Unsupported work queue URL: {queue_url}")